@@ -0,0 +1,123 @@
+import os
+import json
+import hashlib
+import logging
+from workspace_index import normalize_path
+
+logger = logging.getLogger("msBuildScript")
+
+CACHE_FILE_NAME = ".screenshot_analysis_cache.json"
+CACHE_VERSION = 1
+
+
+def file_digest(path = None, data = None):
+    """SHA-1 of a file's content (or of data when the bytes are already in memory)"""
+    digest = hashlib.sha1()
+    if data is not None:
+        digest.update(data)
+    else:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    On-disk JSON manifest of facts derived from source files.
+    Each entry is keyed by path and validated against the file's size, mtime and
+    content hash, so a changed file invalidates only its own entry.
+    """
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @classmethod
+    def for_workspace(cls, workspace_dir):
+        return cls(os.path.join(workspace_dir, CACHE_FILE_NAME))
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data.get("entries", {})
+            else:
+                logger.debug(f"Ignoring analysis cache {self.cache_path} with version {data.get('version')}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read analysis cache {self.cache_path}: {e}")
+
+    def lookup(self, path, kind):
+        """Return the cached facts of kind for path, or None when missing or stale"""
+        entry = self.entries.get(normalize_path(path))
+        if entry is None or kind not in entry["facts"]:
+            self.misses += 1
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.misses += 1
+            return None
+        if stat.st_size != entry["size"]:
+            self.misses += 1
+            return None
+        if stat.st_mtime_ns != entry["mtime_ns"]:
+            # Touched but maybe not changed: fall back to the content hash
+            if file_digest(path) != entry["sha1"]:
+                self.misses += 1
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self.dirty = True
+        self.hits += 1
+        return entry["facts"][kind]
+
+    def content_digest(self, path):
+        """SHA-1 of path, trusting the recorded hash while size and mtime are unchanged"""
+        stat = os.stat(path)
+        key = normalize_path(path)
+        entry = self.entries.get(key)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha1"]
+        sha1 = file_digest(path)
+        if entry is None or entry["sha1"] != sha1 or entry["size"] != stat.st_size:
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha1, "facts": {}}
+            self.entries[key] = entry
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self.dirty = True
+        return sha1
+
+    def store(self, path, kind, facts, data = None):
+        """Record facts of kind for path; data is the file content if it was already read"""
+        try:
+            stat = os.stat(path)
+            sha1 = file_digest(path, data)
+        except OSError as e:
+            logger.error(f"Could not cache facts for {path}: {e}")
+            return
+        key = normalize_path(path)
+        entry = self.entries.get(key)
+        if entry is None or entry["sha1"] != sha1 or entry["size"] != stat.st_size:
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha1, "facts": {}}
+            self.entries[key] = entry
+        entry["mtime_ns"] = stat.st_mtime_ns
+        entry["facts"][kind] = facts
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        temp_path = self.cache_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "entries": self.entries}, f)
+            os.replace(temp_path, self.cache_path)
+            self.dirty = False
+            logger.debug(f"Saved analysis cache to {self.cache_path} ({self.hits} hits, {self.misses} misses)")
+        except OSError as e:
+            logger.error(f"Could not write analysis cache {self.cache_path}: {e}")
@@ -0,0 +1,67 @@
+import os
+import time
+import logging
+
+logger = logging.getLogger("msBuildScript")
+
+SHUTDOWN_MAX_WAIT = 5
+SHUTDOWN_POLL_INITIAL = 0.02
+SHUTDOWN_POLL_MAX = 0.2
+SHUTDOWN_POLL_BACKOFF = 1.5
+
+OUTPUT_EXTENSIONS = (".exe", ".dll")
+
+
+def output_files(info):
+    """The built assemblies a running application keeps open: its output directory's exe/dll and the intermediate assembly"""
+    paths = []
+    try:
+        with os.scandir(info.output_directory) as entries:
+            paths = [entry.path for entry in entries if entry.is_file() and entry.name.lower().endswith(OUTPUT_EXTENSIONS)]
+    except OSError:
+        pass
+    intermediate = os.path.join(info.project_dir, "obj", info.configuration, info.executable_name)
+    if os.path.isfile(intermediate):
+        paths.append(intermediate)
+    return paths
+
+
+def first_locked_file(paths):
+    """
+    The first file that can't be opened for writing (on Windows: still mapped by a process), or None.
+    Read-only files (MSBuild's Copy keeps the attribute) can't be probed this way and are skipped.
+    """
+    for path in paths:
+        if not os.access(path, os.W_OK):
+            continue
+        try:
+            with open(path, "r+b"):
+                pass
+        except FileNotFoundError:
+            continue
+        except OSError:
+            return path
+    return None
+
+
+def wait_for_conditions(conditions, timeout = SHUTDOWN_MAX_WAIT, sleep = time.sleep, clock = time.monotonic):
+    """
+    Poll conditions (name -> callable returning True once satisfied) until all hold or
+    timeout seconds have passed. A satisfied condition is not checked again.
+    Returns (names still pending, seconds waited); the list is empty on success.
+    """
+    started = clock()
+    pending = dict(conditions)
+    delay = SHUTDOWN_POLL_INITIAL
+    while True:
+        for name, satisfied in list(pending.items()):
+            try:
+                if satisfied():
+                    del pending[name]
+            except Exception as e:
+                logger.debug(f"Shutdown condition '{name}' could not be checked: {e}")
+        waited = clock() - started
+        if not pending or waited >= timeout:
+            return list(pending), waited
+        sleep(min(delay, timeout - waited))
+        delay = min(delay * SHUTDOWN_POLL_BACKOFF, SHUTDOWN_POLL_MAX)
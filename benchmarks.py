@@ -0,0 +1,190 @@
+"""
+Micro-benchmarks for the hot paths of msBuildScript that can run without Windows,
+MSBuild or a desktop. Run with `python benchmarks.py`.
+"""
+import base64
+import random
+import re
+import time
+import numpy as np
+from cs_lexer import find_method_body
+from frame_readiness import frames_match, wait_until_stable
+from resx_ico_replace import IconPayload, set_icon_in_tree, splice_icon_value
+from window_backend import FakeWindowBackend, wait_for_new_window, WINDOW_POLL_INITIAL, WINDOW_POLL_MAX
+from tests.helpers import VirtualClock
+
+
+def benchmark_window_detection(projects = 500, seed = 1):
+    """Enumerations and detection latency of the adaptive detector against the old fixed 0.2s polling"""
+    rng = random.Random(seed)
+    # Small samples paint within a few hundred ms, larger ones take seconds
+    launches = {"fast (0.05-0.3s)": [rng.uniform(0.05, 0.3) for _ in range(projects)],
+                "typical (0.3-4s)": [rng.uniform(0.3, 4.0) for _ in range(projects)]}
+
+    print(f"Window detection over {projects} simulated launches per start-up profile:")
+    for profile, delays in launches.items():
+        for name, poll_initial, poll_max in (("fixed 0.2s", 0.2, 0.2), ("adaptive", WINDOW_POLL_INITIAL, WINDOW_POLL_MAX)):
+            enumerations = 0
+            overshoot = 0.0
+            for delay in delays:
+                clock = VirtualClock()
+                backend = FakeWindowBackend(clock)
+                # Unrelated windows opening meanwhile must not be picked
+                backend.open_window("Notification", pid=1, delay=delay / 2)
+                backend.open_window("Sample Form", pid=100, delay=delay)
+                window, polls = wait_for_new_window(backend, set(), lambda: {100}, poll_initial=poll_initial,
+                                                    poll_max=poll_max, sleep=clock.sleep, clock=clock)
+                assert window.title == "Sample Form"
+                enumerations += polls
+                overshoot += clock.now - delay
+            print(f"  {profile:<17} {name:<12} {enumerations:>7} enumerations, "
+                  f"{overshoot / projects * 1000:7.1f} ms average detection delay")
+
+    # What matching on titles alone (no owning PID) would have selected
+    wrong = 0
+    for delay in launches["typical (0.3-4s)"]:
+        clock = VirtualClock()
+        backend = FakeWindowBackend(clock)
+        backend.open_window("Notification", pid=1, delay=delay / 2)
+        backend.open_window("Sample Form", pid=100, delay=delay)
+        window, _ = wait_for_new_window(backend, set(), sleep=clock.sleep, clock=clock)
+        wrong += window.title != "Sample Form"
+    print(f"  matching by title alone picked an unrelated window {wrong} time(s), by owning PID 0 times")
+
+
+def benchmark_frame_readiness(width = 1920, height = 1080, repeats = 50, paint_seconds = 0.8):
+    """Cost of one frame comparison, and the wait for a form that paints for paint_seconds"""
+    rng = np.random.default_rng(1)
+    frame = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    noisy = np.clip(frame.astype(np.int16) + rng.integers(-3, 4, size=frame.shape), 0, 255).astype(np.uint8)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        assert frames_match(frame, noisy)
+    per_compare = (time.perf_counter() - started) / repeats
+
+    clock = VirtualClock()
+    # An unpainted (single-color) window, which must not count as ready however steady it is
+    painted = np.full_like(frame, 240)
+    def grab():
+        # The form fills in top to bottom until paint_seconds, then stays put
+        rows = min(height, int(height * clock.now / paint_seconds))
+        painted[:rows] = frame[:rows]
+        return painted.copy()
+    stable, waited, frames = wait_until_stable(grab, sleep=clock.sleep, clock=clock)
+    print(f"Frame readiness at {width}x{height}:")
+    print(f"  {per_compare * 1000:.1f} ms per frame comparison")
+    print(f"  form painting for {paint_seconds}s captured after {waited:.2f}s ({frames} frames, stable={stable}) "
+          f"instead of the fixed 3s")
+
+
+def make_resx(megabytes, with_icon = False, seed = 1):
+    """A designer-style resx (CRLF, header comment) holding megabytes of embedded images"""
+    rng = random.Random(seed)
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', '<root>',
+             '  <!-- Microsoft ResX Schema, Version 2.0 (header comment kept by the splice) -->',
+             '  <resheader name="resmimetype">', '    <value>text/microsoft-resx</value>', '  </resheader>']
+    size = 0
+    i = 0
+    while size < megabytes * 1024 * 1024:
+        encoded = base64.b64encode(rng.randbytes(48 * 1024)).decode()
+        value = "\r\n        ".join(encoded[j:j + 80] for j in range(0, len(encoded), 80))
+        lines += [f'  <data name="image{i}.Image" type="System.Drawing.Bitmap, System.Drawing" '
+                  'mimetype="application/x-microsoft.net.object.bytearray.base64">',
+                  f'    <value>\r\n        {value}\r\n</value>', '  </data>']
+        size += len(value)
+        i += 1
+    if with_icon:
+        lines += ['  <data name="$this.Icon" type="System.Drawing.Icon, System.Drawing" '
+                  'mimetype="application/x-microsoft.net.object.bytearray.base64">',
+                  '    <value>\r\n        AAABAAEAEBA=\r\n</value>', '  </data>']
+    lines.append('</root>')
+    return "\r\n".join(lines).encode("utf-8") + b"\r\n"
+
+
+def benchmark_resx_update(sizes = (1, 4, 16), repeats = 3):
+    """ElementTree parse and reserialize against the in-place splice, adding and replacing $this.Icon"""
+    payload = IconPayload("bench.ico", random.Random(2).randbytes(32 * 1024))
+    print("resx $this.Icon update (best of %d):" % repeats)
+    for megabytes in sizes:
+        for with_icon in (False, True):
+            original = make_resx(megabytes, with_icon)
+            timings = {}
+            for name, update in (("ElementTree", set_icon_in_tree), ("splice", splice_icon_value)):
+                best = None
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    data, action = update(original, payload.value_text)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[name] = (best, action, b"<!--" in data and b"\r\n" in data)
+            tree, splice = timings["ElementTree"], timings["splice"]
+            print(f"  {megabytes:>3} MB, {tree[1]:<7} ElementTree {tree[0] * 1000:8.1f} ms, splice {splice[0] * 1000:7.1f} ms "
+                  f"({tree[0] / splice[0]:5.1f}x); comments and CRLF kept: ElementTree {tree[2]}, splice {splice[2]}")
+
+
+# The pattern update_designer_file used before the lexer
+GREEDY_INITIALIZE_COMPONENT = re.compile(r"(private void InitializeComponent\s*\(\)\s*\{)([\s\S]*)(\s*\}\s*#endregion)")
+
+
+def make_designer_source(controls, designer = True):
+    """
+    A form with controls fields. designer=True gives a generated .Designer.cs (method inside
+    #region); otherwise a hand-written single-file form with methods after InitializeComponent.
+    """
+    body = []
+    for i in range(controls):
+        body += [f'            this.button{i} = new System.Windows.Forms.Button();',
+                 f'            this.button{i}.Location = new System.Drawing.Point({i}, {i * 2});',
+                 f'            this.button{i}.Text = "Click {{{i}}} // not a comment";',
+                 f'            this.button{i}.Click += new System.EventHandler(this.button{i}_Click);']
+    lines = ['namespace Sample', '{', '    partial class Form1', '    {']
+    if designer:
+        lines += ['        #region Windows Form Designer generated code']
+    lines += ['        private void InitializeComponent()', '        {'] + body + ['        }']
+    if designer:
+        lines += ['        #endregion']
+    else:
+        for i in range(controls):
+            lines += [f'        private void button{i}_Click(object sender, EventArgs e)', '        {',
+                      f'            MessageBox.Show($"{{sender}} clicked {i}");', '        }']
+        lines += ['        #region Helpers', '        private void Log(string s) { }', '        #endregion']
+    lines += ['    }', '}']
+    return "\r\n".join(lines) + "\r\n"
+
+
+def benchmark_designer_locator(sizes = (50, 500, 5000), repeats = 5):
+    """Finding the InitializeComponent body with the lexer against the old greedy regex"""
+    print("InitializeComponent locator (best of %d):" % repeats)
+    for controls in sizes:
+        for designer in (True, False):
+            source = make_designer_source(controls, designer)
+            expected_end = source.index("\r\n        }\r\n") + 2 + 8
+            timings = {}
+            for name, locate in (("regex", lambda: GREEDY_INITIALIZE_COMPONENT.search(source)),
+                                 ("lexer", lambda: find_method_body(source))):
+                best = None
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    found = locate()
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                if found is None:
+                    correct = False
+                elif name == "regex":
+                    correct = found.end(2) == expected_end
+                else:
+                    correct = found[1] == expected_end
+                timings[name] = (best, correct)
+            kind = "designer" if designer else "single-file"
+            megabytes = len(source) / (1024 * 1024)
+            regex, lexer = timings["regex"], timings["lexer"]
+            print(f"  {controls:>5} controls {kind:<11} ({megabytes:5.2f} MB): regex {regex[0] * 1000:7.2f} ms "
+                  f"body correct {regex[1]!s:<5}, lexer {lexer[0] * 1000:7.2f} ms ({megabytes / lexer[0]:6.1f} MB/s) "
+                  f"body correct {lexer[1]}")
+
+
+if __name__ == "__main__":
+    benchmark_window_detection()
+    benchmark_frame_readiness()
+    benchmark_resx_update()
+    benchmark_designer_locator()
@@ -0,0 +1,88 @@
+import threading
+import logging
+import numpy as np
+from PIL import Image
+from frame_readiness import is_blank
+
+logger = logging.getLogger("msBuildScript")
+
+CAPTURE_BACKENDS = ("pyautogui", "mss")
+
+
+class Frame:
+    """
+    A captured image kept in memory. pixels is an H x W x C uint8 array in
+    channel_order ("RGB" or "BGRA"), shared by the preview, checks and the PNG
+    encoder without being copied or re-read from disk.
+    """
+    def __init__(self, pixels, channel_order):
+        self.pixels = pixels
+        self.channel_order = channel_order
+
+    @property
+    def width(self):
+        return self.pixels.shape[1]
+
+    @property
+    def height(self):
+        return self.pixels.shape[0]
+
+    def to_image(self):
+        """A PIL RGB image over the frame's pixels"""
+        if self.channel_order == "BGRA":
+            # Decoded straight from the buffer, no intermediate array
+            return Image.frombuffer("RGB", (self.width, self.height), self.pixels, "raw", "BGRX", 0, 1)
+        return Image.fromarray(self.pixels, "RGB")
+
+    def is_blank(self):
+        """True when every pixel has the same color, i.e. the window had not painted anything"""
+        return is_blank(self.pixels)
+
+
+class CaptureBackend:
+    """Grabs a screen region (left, top, width, height) as a Frame"""
+    def grab(self, region):
+        raise NotImplementedError
+
+
+class PyautoguiCapture(CaptureBackend):
+    def __init__(self):
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def grab(self, region):
+        return Frame(np.asarray(self._pyautogui.screenshot(region=region)), "RGB")
+
+
+class MssCapture(CaptureBackend):
+    """Faster grabs through mss (optional dependency); the BGRA buffer is used as is"""
+    def __init__(self):
+        import mss
+        self._mss = mss
+        # mss handles are not shareable between threads
+        self._local = threading.local()
+
+    def grab(self, region):
+        if not hasattr(self._local, "sct"):
+            self._local.sct = self._mss.mss()
+        left, top, width, height = region
+        shot = self._local.sct.grab({"left": left, "top": top, "width": width, "height": height})
+        pixels = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        return Frame(pixels, "BGRA")
+
+
+_backends = {}
+
+def get_capture_backend(name = "pyautogui"):
+    """The capture backend called name, created once; raises if its package is not installed"""
+    if name not in _backends:
+        if name == "pyautogui":
+            _backends[name] = PyautoguiCapture()
+        elif name == "mss":
+            try:
+                _backends[name] = MssCapture()
+            except ImportError:
+                raise Exception("The mss capture backend needs the mss package (pip install mss)")
+        else:
+            raise Exception(f"Unknown capture backend {name!r}, expected one of {', '.join(CAPTURE_BACKENDS)}")
+    return _backends[name]
@@ -0,0 +1,69 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from workspace_index import normalize_path
+from analysis_cache import file_digest
+
+logger = logging.getLogger("msBuildScript")
+
+FINGERPRINT_FILE_NAME = ".screenshot_fingerprints.json"
+
+
+def project_fingerprint(project, csproj, icon_path, capture_settings, cache = None):
+    """
+    Hash everything that can change a project's screenshot: the csproj, its sources,
+    resx and designer files, the icon and the capture settings.
+    """
+    def content_digest(path):
+        return cache.content_digest(path) if cache is not None else file_digest(path)
+
+    digest = hashlib.sha256()
+    csproj_path = os.path.join(project.project_dir, csproj)
+    for path in sorted(set([csproj_path] + project.cs_files + project.resx_files)):
+        relative_path = os.path.relpath(path, project.project_dir).replace(os.sep, "/")
+        digest.update(f"{relative_path}\0{content_digest(path)}\0".encode("utf-8"))
+    digest.update(f"icon\0{content_digest(icon_path)}\0".encode("utf-8"))
+    digest.update(json.dumps(capture_settings, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FingerprintStore:
+    """Fingerprints of the last successful capture of each project, kept next to the workspace"""
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self.fingerprints = {}
+        # Screenshots are recorded from the image writer threads
+        self._lock = threading.RLock()
+        if os.path.exists(store_path):
+            try:
+                with open(store_path, "r", encoding="utf-8") as f:
+                    self.fingerprints = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read fingerprints {store_path}: {e}")
+
+    @classmethod
+    def for_workspace(cls, workspace_dir):
+        return cls(os.path.join(workspace_dir, FINGERPRINT_FILE_NAME))
+
+    def is_current(self, project_dir, csproj, fingerprint):
+        """True if the project was captured with this exact fingerprint and the screenshot still exists"""
+        key = normalize_path(os.path.join(project_dir, csproj))
+        return (self.fingerprints.get(key) == fingerprint
+                and os.path.exists(os.path.join(project_dir, "screenshot.png")))
+
+    def record(self, project_dir, csproj, fingerprint):
+        with self._lock:
+            self.fingerprints[normalize_path(os.path.join(project_dir, csproj))] = fingerprint
+            self.save()
+
+    def save(self):
+        temp_path = self.store_path + ".tmp"
+        try:
+            with self._lock:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.fingerprints, f, indent=1, sort_keys=True)
+                os.replace(temp_path, self.store_path)
+        except OSError as e:
+            logger.error(f"Could not write fingerprints {self.store_path}: {e}")
@@ -0,0 +1,125 @@
+import os
+import re
+import logging
+from workspace_index import normalize_path
+
+logger = logging.getLogger("msBuildScript")
+
+CLASS_PATTERN = re.compile(rb"\bclass\s+([A-Za-z_][A-Za-z0-9_]*)")
+APPLICATION_RUN_PATTERN = re.compile(rb"Application\.Run\s*\(\s*new\s+([a-zA-Z0-9_]+)")
+
+
+def scan_cs_source(data):
+    """
+    Scan the raw bytes of a .cs file.
+    Returns (declared class names, form passed to Application.Run(new ...) or None).
+    The regexes only run when a cheap substring check says they can match.
+    """
+    classes = []
+    entry_form = None
+    if b"class" in data:
+        classes = list(dict.fromkeys(name.decode("utf-8", "ignore") for name in CLASS_PATTERN.findall(data)))
+    if b"Application.Run" in data:
+        match = APPLICATION_RUN_PATTERN.search(data)
+        if match:
+            entry_form = match.group(1).decode("utf-8", "ignore")
+    return classes, entry_form
+
+
+def scan_cs_file(file_path):
+    with open(file_path, "rb") as f:
+        return scan_cs_source(f.read())
+
+
+def strip_source_suffix(file_path):
+    """Form1.Designer.cs / Form1.cs -> Form1"""
+    name = os.path.basename(file_path)
+    lower_name = name.lower()
+    for suffix in (".designer.cs", ".cs"):
+        if lower_name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+class ClassSymbolIndex:
+    """
+    Maps C# class names to the files declaring them (partial classes give several files)
+    and records which files call Application.Run(new Form).
+    Built in one pass over the .cs files of a project.
+    """
+    def __init__(self, project, cache = None):
+        self.project = project
+        self.classes = {}
+        self.entry_forms = {}
+        self._resx_by_path = {normalize_path(path): path for path in project.resx_files}
+        for file_path in project.cs_files:
+            try:
+                classes, entry_form = self._scan(file_path, cache)
+            except OSError as e:
+                logger.error(f"Error reading file {file_path}: {e}")
+                continue
+            for class_name in classes:
+                self.classes.setdefault(class_name, []).append(file_path)
+            if entry_form:
+                self.entry_forms[normalize_path(file_path)] = entry_form
+
+    @staticmethod
+    def _scan(file_path, cache):
+        if cache is not None:
+            facts = cache.lookup(file_path, "cs_symbols")
+            if facts is not None:
+                return facts["classes"], facts["entry_form"]
+        with open(file_path, "rb") as f:
+            data = f.read()
+        classes, entry_form = scan_cs_source(data)
+        if cache is not None:
+            cache.store(file_path, "cs_symbols", {"classes": classes, "entry_form": entry_form}, data)
+        return classes, entry_form
+
+    def files_declaring(self, class_name):
+        return list(self.classes.get(class_name, []))
+
+    def entry_file(self):
+        """Program.cs if present, otherwise the first top-level file calling Application.Run"""
+        top_level_files = self.project.top_level_cs_files()
+        for file_path in top_level_files:
+            if os.path.basename(file_path) == "Program.cs":
+                return file_path
+        for file_path in top_level_files:
+            if normalize_path(file_path) in self.entry_forms:
+                return file_path
+        return None
+
+    def entry_form(self, entry_file):
+        return self.entry_forms.get(normalize_path(entry_file))
+
+    def designer_candidates(self, class_name):
+        """Files declaring class_name, with *.Designer.cs files first"""
+        files = self.files_declaring(class_name)
+        designers = [f for f in files if f.lower().endswith(".designer.cs")]
+        return designers + [f for f in files if f not in designers]
+
+    def resx_candidates(self, class_name):
+        """The .resx siblings (Form1.cs -> Form1.resx) of the files declaring class_name"""
+        candidates = []
+        for file_path in self.designer_candidates(class_name):
+            resx_path = os.path.join(os.path.dirname(file_path), strip_source_suffix(file_path) + ".resx")
+            resx_path = self._resx_by_path.get(normalize_path(resx_path))
+            if resx_path is not None and resx_path not in candidates:
+                candidates.append(resx_path)
+        return candidates
+
+
+_class_index_cache = {}
+
+def get_class_index(project, cache = None):
+    """
+    Return the ClassSymbolIndex of a project, building it once per directory.
+    With an AnalysisCache, unchanged files are not read or parsed again.
+    """
+    key = normalize_path(project.project_dir)
+    class_index = _class_index_cache.get(key)
+    if class_index is None or class_index.project is not project:
+        class_index = ClassSymbolIndex(project, cache)
+        _class_index_cache[key] = class_index
+    return class_index
@@ -0,0 +1,129 @@
+import re
+import functools
+
+# String, verbatim string and char literals, unrolled so long strings match without backtracking
+LITERAL_PATTERN = re.compile(r'@"[^"]*(?:""[^"]*)*"|"[^"\\\n]*(?:\\.[^"\\\n]*)*"|' r"'[^'\\\n]*(?:\\.[^'\\\n]*)*'", re.S)
+INTERPOLATED_START = re.compile(r'\$@"|@\$"|\$"')
+# C# 11 raw strings: """...""" (or more quotes), optionally interpolated with $"""...""" / $$"""..."""
+RAW_START = re.compile(r'\$*"{3,}')
+
+# One token per match: the run of plain code before it is consumed by the leading
+# character class, so the regex engine never retries the alternation position by position.
+# Outside literals and comments '#' only starts a preprocessor line.
+TOKEN_PATTERN = re.compile(
+    r"""[^/#$@"'{}]*"""
+    r"(?:(?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))"
+    r"|(?P<directive>\#[^\n]*)"
+    r'|(?P<raw>\$*"{3,})'
+    r'|(?P<interpolated>\$@"|@\$"|\$")'
+    r"|(?P<literal>" + LITERAL_PATTERN.pattern + r")"
+    r"|(?P<open>\{)|(?P<close>\})"
+    r"|(?P<other>.)|\Z)",
+    re.S)
+
+
+@functools.lru_cache(maxsize=None)
+def _declaration_pattern(method_name):
+    return re.compile(r"void\s+" + re.escape(method_name) + r"\s*\(\s*\)\s*\{")
+
+
+def _skip_raw(source, pos, quotes):
+    """End of a raw string whose contents start at pos and end with the same number of quotes it opened with"""
+    end = source.find('"' * quotes, pos)
+    return len(source) if end < 0 else end + quotes
+
+
+def _skip_literal(source, pos):
+    """End of the string or char literal starting at pos, or None when none starts there"""
+    match = RAW_START.match(source, pos)
+    if match:
+        return _skip_raw(source, match.end(), match.group().count('"'))
+    match = INTERPOLATED_START.match(source, pos)
+    if match:
+        return _skip_interpolated(source, match.end(), "@" in match.group())
+    match = LITERAL_PATTERN.match(source, pos)
+    return match.end() if match else None
+
+
+def _skip_interpolated(source, pos, verbatim):
+    """
+    End of an interpolated string whose contents start at pos. Braces inside the
+    {holes} are counted and literals in them skipped, so $"{(a ? "}" : b)}" ends right.
+    """
+    length = len(source)
+    depth = 0
+    while pos < length:
+        c = source[pos]
+        if depth == 0:
+            if c == '"':
+                if verbatim and source.startswith('"', pos + 1):
+                    pos += 2
+                    continue
+                return pos + 1
+            if c == "\\" and not verbatim:
+                pos += 2
+                continue
+            if c == "\n" and not verbatim:
+                # Unterminated; resume lexing on the next line
+                return pos
+            if c in "{}" and source.startswith(c, pos + 1):
+                # {{ and }} are escaped braces
+                pos += 2
+                continue
+            if c == "{":
+                depth = 1
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+        elif c in "\"'@$":
+            end = _skip_literal(source, pos)
+            if end is not None:
+                pos = end
+                continue
+        pos += 1
+    return length
+
+
+def find_method_body(source, method_name = "InitializeComponent"):
+    """
+    Locate the body of the parameterless `void method_name()` in C# source in one pass.
+    Comments, preprocessor lines and string, verbatim, interpolated, raw and char
+    literals are skipped, and the body ends at the brace matching its opening one.
+    Returns (start, end) so that source[start:end] is the text between the braces,
+    or None when there is no such method or its braces don't balance.
+    Braces in inactive #if branches are counted like any other code.
+    """
+    # Where a declaration could open its body; the lexer decides which of these are real code
+    declarations = {match.end() - 1: match.start() for match in _declaration_pattern(method_name).finditer(source)}
+    if not declarations:
+        return None
+    depth = 0
+    body_depth = None
+    body_start = None
+    previous_end = 0
+    pos = 0
+    length = len(source)
+    while pos < length:
+        match = TOKEN_PATTERN.match(source, pos)
+        kind = match.lastgroup
+        pos = match.end()
+        if kind == "open":
+            if body_start is None and match.end() - 1 in declarations and declarations[match.end() - 1] >= previous_end:
+                # No comment or literal covers the declaration in front of this brace
+                body_depth = depth
+                body_start = pos
+            depth += 1
+        elif kind == "close":
+            depth -= 1
+            if body_start is not None and depth == body_depth:
+                return body_start, pos - 1
+        elif kind == "interpolated":
+            pos = _skip_interpolated(source, pos, "@" in match.group())
+        elif kind == "raw":
+            pos = _skip_raw(source, pos, match.group().count('"'))
+        elif kind is None:
+            break
+        if kind != "other":
+            previous_end = pos
+    return None
@@ -0,0 +1,178 @@
+import os
+import re
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from workspace_index import normalize_path
+
+logger = logging.getLogger("msBuildScript")
+
+EXECUTABLE_OUTPUT_TYPES = {"exe", "winexe"}
+PROPERTY_REFERENCE_PATTERN = re.compile(r"\$\(([A-Za-z0-9_]+)\)")
+# 'left' == 'right' / 'left' != 'right', the comparisons designer-generated projects use
+COMPARISON_PATTERN = re.compile(r"^\s*'([^']*)'\s*(==|!=)\s*'([^']*)'\s*$")
+DEFAULT_PLATFORM = "AnyCPU"
+
+
+def _local_name(element):
+    # Legacy projects put everything in the msbuild/2003 namespace
+    return element.tag.split("}")[-1]
+
+
+def _msbuild_path(value):
+    return value.replace("\\", os.sep).replace("/", os.sep)
+
+
+def _expand_properties(value, properties):
+    return PROPERTY_REFERENCE_PATTERN.sub(lambda m: properties.get(m.group(1), ""), value)
+
+
+def _applies_to(condition, properties):
+    """
+    Very small evaluation of MSBuild conditions: unconditional elements apply, and so
+    do string comparisons (joined by and/or) that hold for the current properties, e.g.
+    '$(Configuration)|$(Platform)' == 'Debug|AnyCPU'. Anything else (Exists(), parentheses,
+    numeric comparisons) is treated as false.
+    """
+    if not condition or not condition.strip():
+        return True
+    for clause in re.split(r"\s+or\s+", condition, flags=re.I):
+        for comparison in re.split(r"\s+and\s+", clause, flags=re.I):
+            match = COMPARISON_PATTERN.match(comparison)
+            if match is None:
+                break
+            # MSBuild compares strings case-insensitively
+            equal = _expand_properties(match.group(1), properties).lower() == _expand_properties(match.group(3), properties).lower()
+            if equal != (match.group(2) == "=="):
+                break
+        else:
+            return True
+    return False
+
+
+def _default_platform(root):
+    """The project's own default, <Platform Condition=" '$(Platform)' == '' ">AnyCPU</Platform>, else AnyCPU"""
+    for element in root:
+        if _local_name(element) != "PropertyGroup":
+            continue
+        for prop in element:
+            if _local_name(prop) == "Platform" and prop.text and prop.text.strip():
+                if _applies_to(prop.get("Condition"), {}) and _applies_to(element.get("Condition"), {}):
+                    return prop.text.strip()
+    return DEFAULT_PLATFORM
+
+
+class CsprojInfo:
+    """
+    The parts of a legacy or SDK-style .csproj needed to locate its build output:
+    AssemblyName, TargetFramework(s), OutputType, OutputPath, ProjectReferences
+    and PackageReferences.
+    """
+    def __init__(self, csproj_path, configuration = "Debug"):
+        self.path = os.path.abspath(csproj_path)
+        self.project_dir = os.path.dirname(self.path)
+        self.configuration = configuration
+        self.project_references = []
+        self.package_references = []
+
+        root = ET.parse(self.path).getroot()
+        self.sdk_style = root.get("Sdk") is not None or any(_local_name(e) == "Sdk" for e in root)
+        # Built like a command-line build without /p:Platform, so only the default platform's groups apply
+        self.platform = _default_platform(root)
+        self.properties = {"MSBuildProjectName": os.path.splitext(os.path.basename(self.path))[0],
+                           "Configuration": configuration, "Platform": self.platform}
+        for element in root:
+            if _local_name(element) == "PropertyGroup" and _applies_to(element.get("Condition"), self.properties):
+                for prop in element:
+                    if _applies_to(prop.get("Condition"), self.properties) and prop.text is not None:
+                        self.properties[_local_name(prop)] = self._expand(prop.text.strip())
+            elif _local_name(element) == "ItemGroup":
+                for item in element:
+                    if _local_name(item) == "ProjectReference" and item.get("Include"):
+                        reference = os.path.join(self.project_dir, _msbuild_path(item.get("Include")))
+                        self.project_references.append(os.path.normpath(reference))
+                    elif _local_name(item) == "PackageReference" and item.get("Include"):
+                        version = item.get("Version")
+                        if version is None:
+                            version_element = next((e for e in item if _local_name(e) == "Version"), None)
+                            version = version_element.text.strip() if version_element is not None and version_element.text else ""
+                        self.package_references.append((item.get("Include"), self._expand(version)))
+
+        self.assembly_name = self.properties.get("AssemblyName") or self.properties["MSBuildProjectName"]
+        self.output_type = self.properties.get("OutputType", "Library")
+        self.target_frameworks = self._target_frameworks()
+        self.output_path = self._output_path()
+
+    def _expand(self, value):
+        return _expand_properties(value, self.properties)
+
+    def _target_frameworks(self):
+        if self.properties.get("TargetFrameworks"):
+            return [tfm.strip() for tfm in self.properties["TargetFrameworks"].split(";") if tfm.strip()]
+        if self.properties.get("TargetFramework"):
+            return [self.properties["TargetFramework"]]
+        version = self.properties.get("TargetFrameworkVersion")
+        if version:
+            # v4.8 -> net48, v4.7.2 -> net472
+            return ["net" + version.lstrip("vV").replace(".", "")]
+        return []
+
+    def _output_path(self):
+        """Output directory relative to the project directory"""
+        if self.properties.get("OutputPath"):
+            output_path = _msbuild_path(self.properties["OutputPath"])
+        else:
+            base_output_path = _msbuild_path(self.properties.get("BaseOutputPath", "bin" + os.sep))
+            output_path = os.path.join(base_output_path, self.configuration)
+        if self.sdk_style:
+            if self.target_frameworks and self.properties.get("AppendTargetFrameworkToOutputPath", "true").lower() != "false":
+                output_path = os.path.join(output_path, self.target_frameworks[0])
+            runtime_identifier = self.properties.get("RuntimeIdentifier")
+            if runtime_identifier and self.properties.get("AppendRuntimeIdentifierToOutputPath", "true").lower() != "false":
+                output_path = os.path.join(output_path, runtime_identifier)
+        return os.path.normpath(output_path)
+
+    @property
+    def assets_file(self):
+        """NuGet restore output; present once the project has been restored"""
+        intermediate_path = _msbuild_path(self.properties.get("BaseIntermediateOutputPath", "obj" + os.sep))
+        return os.path.normpath(os.path.join(self.project_dir, intermediate_path, "project.assets.json"))
+
+    @property
+    def needs_restore(self):
+        """SDK-style and PackageReference projects have to be restored by NuGet before building"""
+        return self.sdk_style or bool(self.package_references)
+
+    @property
+    def is_executable(self):
+        return self.output_type.lower() in EXECUTABLE_OUTPUT_TYPES
+
+    @property
+    def output_directory(self):
+        return os.path.join(self.project_dir, self.output_path)
+
+    @property
+    def executable_name(self):
+        return self.assembly_name + ".exe"
+
+    @property
+    def output_executable(self):
+        """Full path of the .exe a build produces, or None for library projects"""
+        if not self.is_executable:
+            return None
+        return os.path.join(self.output_directory, self.executable_name)
+
+
+_csproj_cache = {}
+_csproj_cache_lock = threading.Lock()
+
+def load_csproj(csproj_path, configuration = "Debug"):
+    """Parse a .csproj once per (path, mtime, configuration); raises if it can't be parsed"""
+    key = (normalize_path(csproj_path), os.stat(csproj_path).st_mtime_ns, configuration)
+    with _csproj_cache_lock:
+        info = _csproj_cache.get(key)
+    if info is None:
+        info = CsprojInfo(csproj_path, configuration)
+        with _csproj_cache_lock:
+            _csproj_cache[key] = info
+    return info
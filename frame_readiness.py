@@ -0,0 +1,72 @@
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger("msBuildScript")
+
+# A window is ready once this many consecutive frames match
+READY_STABLE_FRAMES = 3
+# Per-channel difference below which two pixels count as equal (compression/dithering noise)
+READY_TOLERANCE = 8
+# Share of pixels allowed to differ anyway, e.g. a blinking caret
+READY_CHANGED_FRACTION = 0.001
+READY_INTERVAL = 0.1
+READY_MAX_WAIT = 10
+# Only every n-th row and column is compared; plenty to see a form still painting
+READY_SAMPLE_STRIDE = 2
+
+
+def frames_match(previous, current, tolerance = READY_TOLERANCE, changed_fraction = READY_CHANGED_FRACTION, stride = READY_SAMPLE_STRIDE):
+    """True when two frames (H x W x C uint8 arrays) are equal within tolerance"""
+    if previous is None or current is None or previous.shape != current.shape:
+        return False
+    a = previous[::stride, ::stride]
+    b = current[::stride, ::stride]
+    # int16 so the subtraction can't wrap around
+    difference = np.abs(a.astype(np.int16) - b.astype(np.int16))
+    if difference.ndim == 3:
+        difference = difference.max(axis=2)
+    changed = np.count_nonzero(difference > tolerance)
+    return changed <= changed_fraction * difference.size
+
+
+def is_blank(frame):
+    """True when every pixel has the same color, i.e. the window has not painted anything yet"""
+    return bool((frame == frame[0, 0]).all())
+
+
+def has_content(frame):
+    return not is_blank(frame)
+
+
+def wait_until_stable(grab, stable_frames = READY_STABLE_FRAMES, max_wait = READY_MAX_WAIT, min_wait = 0,
+                      interval = READY_INTERVAL, tolerance = READY_TOLERANCE, changed_fraction = READY_CHANGED_FRACTION,
+                      ready = has_content, sleep = time.sleep, clock = time.monotonic):
+    """
+    Grab frames until stable_frames consecutive ones match (and at least min_wait seconds
+    have passed), or max_wait seconds are up. grab() returns the current frame as a numpy
+    array and may change size between calls (e.g. while the window maximizes).
+    Frames failing ready(frame) never count as stable; by default that is a single-color
+    frame, which an unpainted window gives just as steadily as a finished one.
+    Returns (stable, seconds waited, frames grabbed).
+    """
+    started = clock()
+    previous = None
+    matching = 1
+    frames = 0
+    while True:
+        current = grab()
+        frames += 1
+        if ready is not None and not ready(current):
+            matching = 0
+        elif frames_match(previous, current, tolerance, changed_fraction):
+            matching += 1
+        else:
+            matching = 1
+        previous = current
+        waited = clock() - started
+        if matching >= stable_frames and waited >= min_wait:
+            return True, waited, frames
+        if waited >= max_wait:
+            return False, waited, frames
+        sleep(interval)
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import logging
+from workspace_index import normalize_path
+from csproj_model import load_csproj
+from analysis_cache import CACHE_FILE_NAME
+from capture_fingerprints import FINGERPRINT_FILE_NAME
+from source_plan import PLAN_PATCH_NAME, PLAN_SUMMARY_NAME
+
+logger = logging.getLogger("msBuildScript")
+
+SCREENSHOT_FILE_NAME = "screenshot.png"
+# Files the script itself writes into the workspace; they never make a project "changed"
+GENERATED_FILE_NAMES = (SCREENSHOT_FILE_NAME, CACHE_FILE_NAME, CACHE_FILE_NAME + ".tmp",
+                        FINGERPRINT_FILE_NAME, FINGERPRINT_FILE_NAME + ".tmp", PLAN_PATCH_NAME, PLAN_SUMMARY_NAME)
+
+
+def run_git(args, cwd):
+    """Run a git query and return its NUL-separated output as a list"""
+    result = subprocess.run(["git"] + args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise Exception(f"git {' '.join(args)} failed: {result.stderr.decode(errors='replace').strip()}")
+    return [item for item in result.stdout.decode("utf-8", errors="replace").split("\0") if item]
+
+
+def changed_files(workspace_dir, base, head = None, ignored_names = GENERATED_FILE_NAMES):
+    """
+    Absolute paths of files under workspace_dir that changed between base and head.
+    Without head, base is compared with the working tree (staged, unstaged and untracked files).
+    Files named like one of ignored_names, in any directory, are left out.
+    """
+    toplevel = run_git(["rev-parse", "--show-toplevel"], workspace_dir)[0].strip()
+    pathspec = ["--", os.path.abspath(workspace_dir)] + [f":(exclude,glob)**/{name}" for name in ignored_names]
+    if head is not None:
+        paths = run_git(["diff", "--name-only", "--no-renames", "-z", base, head] + pathspec, workspace_dir)
+    else:
+        paths = run_git(["diff", "--name-only", "--no-renames", "-z", base] + pathspec, workspace_dir)
+        paths += run_git(["ls-files", "--others", "--exclude-standard", "--full-name", "-z"] + pathspec, workspace_dir)
+    return [os.path.join(toplevel, *path.split("/")) for path in paths]
+
+
+def owning_project_dirs(index, file_path):
+    """Every indexed project directory containing file_path (the file may be deleted)"""
+    owners = []
+    directory = os.path.dirname(normalize_path(file_path))
+    root = normalize_path(index.root)
+    while True:
+        project = index.projects.get(directory)
+        if project is not None:
+            owners.append(project.project_dir)
+        if directory == root or os.path.dirname(directory) == directory:
+            break
+        directory = os.path.dirname(directory)
+    return owners
+
+
+def with_dependents(index, project_dirs):
+    """Add every project that depends on one of project_dirs through ProjectReference, transitively"""
+    dependents = {}
+    for project in index.projects.values():
+        for csproj in project.csproj_files:
+            try:
+                references = load_csproj(os.path.join(project.project_dir, csproj)).project_references
+            except Exception as e:
+                logger.error(f"Could not parse {csproj} in {project.project_dir}: {e}")
+                continue
+            for reference in references:
+                dependents.setdefault(normalize_path(os.path.dirname(reference)), set()).add(project.project_dir)
+
+    selected = set(project_dirs)
+    pending = list(project_dirs)
+    while pending:
+        for dependent in dependents.get(normalize_path(pending.pop()), ()):
+            if dependent not in selected:
+                selected.add(dependent)
+                pending.append(dependent)
+    return selected
+
+
+def changed_project_dirs(index, base, head = None, ignored_names = GENERATED_FILE_NAMES):
+    """Project directories affected by the changes between base and head (or the working tree)"""
+    files = changed_files(index.root, base, head, ignored_names)
+    changed = set()
+    for file_path in files:
+        changed.update(owning_project_dirs(index, file_path))
+    selected = with_dependents(index, changed)
+    logger.debug(f"git: {len(files)} changed file(s) touch {len(changed)} project(s), {len(selected)} with dependents")
+    return selected
@@ -0,0 +1,75 @@
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("msBuildScript")
+
+# Pillow's default zlib level; 9 is smaller and slower, 1 is fastest
+PNG_COMPRESS_LEVEL = 6
+IMAGE_WRITER_WORKERS = 2
+# Frames waiting to be encoded; submit() blocks beyond this so full-screen buffers can't pile up
+IMAGE_WRITER_MAX_PENDING = 4
+
+
+class ImageWriter:
+    """
+    Encodes and writes captured frames on a small thread pool (zlib releases the GIL,
+    so encoding overlaps with closing the app and launching the next one). flush()
+    is the barrier that waits for every pending write.
+    """
+    def __init__(self, workers = IMAGE_WRITER_WORKERS, max_pending = IMAGE_WRITER_MAX_PENDING,
+                 compress_level = PNG_COMPRESS_LEVEL, optimize = False):
+        self.compress_level = compress_level
+        self.optimize = optimize
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="png-writer")
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.written = 0
+        self.failed = 0
+
+    def _write(self, frame, path, on_done):
+        error = None
+        try:
+            frame.to_image().save(path, format="PNG", compress_level=self.compress_level, optimize=self.optimize)
+            logger.debug(f"Screenshot saved to: {path}")
+        except Exception as e:
+            error = e
+            logger.error(f"Failed to write screenshot {path}: {e}")
+        finally:
+            self._slots.release()
+        with self._lock:
+            if error is None:
+                self.written += 1
+            else:
+                self.failed += 1
+        if on_done is not None:
+            try:
+                on_done(path, error)
+            except Exception as e:
+                logger.error(f"Screenshot callback for {path} failed: {e}")
+
+    def submit(self, frame, path, on_done = None):
+        """Queue frame to be written to path as PNG; on_done(path, error) runs on the writer thread afterwards"""
+        self._slots.acquire()
+        future = self._executor.submit(self._write, frame, path, on_done)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def flush(self):
+        """Wait for every queued write; returns (written, failed) so far"""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.result()
+        return self.written, self.failed
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
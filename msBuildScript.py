@@ -1,28 +1,154 @@
 import os
 import time
 import subprocess
-import pyautogui
-import pygetwindow as gw
-import psutil
 import logging
-from pathlib import Path
 import signal
-from resx_ico_replace import ResxIconUpdater
-import xml.etree.ElementTree as ET
-from pathlib import Path
+import argparse
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from resx_ico_replace import ResxIconUpdater, IconRegistry, write_if_changed
+from workspace_index import WorkspaceIndex
+from toolchain import get_toolchain
+from process_supervisor import get_supervisor
+from window_backend import WINDOW_DETECT_TIMEOUT, get_window_backend, wait_for_new_window
+from frame_readiness import READY_MAX_WAIT, READY_STABLE_FRAMES, wait_until_stable
+from capture_backend import CAPTURE_BACKENDS, get_capture_backend
+from image_writer import IMAGE_WRITER_WORKERS, PNG_COMPRESS_LEVEL, ImageWriter
+from app_shutdown import SHUTDOWN_MAX_WAIT, output_files, first_locked_file, wait_for_conditions
+from class_index import get_class_index
+from cs_lexer import find_method_body
+from source_plan import SourcePlan, PLAN_PATCH_NAME, PLAN_SUMMARY_NAME
+from analysis_cache import AnalysisCache
+from capture_fingerprints import FingerprintStore, project_fingerprint
+from git_changes import GENERATED_FILE_NAMES, changed_project_dirs
+from pipeline import ProjectJob, Stage, BatchStage, run_pipeline
+from csproj_model import load_csproj
+from workspace_build import write_solution, collect_package_references, restore_is_current
 import re
 import cv2
-import numpy as np
-from PIL import Image
 
-def show_image(image_path):
-    # Open images using PIL
-    try:
-        img_pil = Image.open(image_path)
-    except FileNotFoundError as e:
-        print(f"Error opening image files: {e}")
-    img_cv = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
-    cv2.imshow(image_path, img_cv)
+ICON_PATH = 'C1.ico'
+
+# Threads patching resx/designer files; the work is mostly file I/O
+PREPARE_WORKERS = 4
+
+# Inset of the captured region from the window edges (cuts off the border/shadow)
+SCREENSHOT_OFFSET = 4
+MAXIMIZED_SCREENSHOT_OFFSET = 14
+# Projects whose forms render in stages (e.g. an embedded HTML editor) and can look
+# settled before they are done; they get a minimum wait before the stability check counts
+SLOW_PAINTING_PROJECTS = {"XHtmlEditor": 3.0}
+
+# Generated in the workspace root for the single batch restore / solution build
+RESTORE_SOLUTION_NAME = ".screenshot_restore.sln"
+BUILD_SOLUTION_NAME = ".screenshot_build.sln"
+BUILD_BINARY_LOG_NAME = ".screenshot_build.binlog"
+# Never count as source changes for --changed-since
+OUTPUT_FILE_NAMES = GENERATED_FILE_NAMES + (RESTORE_SOLUTION_NAME, BUILD_SOLUTION_NAME, BUILD_BINARY_LOG_NAME)
+
+# Output kept in memory per command for failure reports; everything else only goes to the debug log
+OUTPUT_CONTEXT_LINES = 200
+# Last stderr lines kept for the exception of a failed step
+STDERR_TAIL_LINES = 200
+MAX_REPORTED_ERRORS = 50
+MSBUILD_DIAGNOSTIC_PATTERN = re.compile(r":\s*(error|warning)\s+[A-Za-z]*\d+\s*:", re.IGNORECASE)
+
+# Wall-clock limits per step in seconds (None = no limit), overridable with --stage-timeout
+DEFAULT_STAGE_TIMEOUTS = {
+    "Clean": 300,
+    "Restore": 900,
+    "Build": 1800,
+    "Restore (workspace)": 3600,
+    "Solution build": 4 * 3600,
+}
+
+# MSBuild (normal verbosity) reports each project of the solution as it finishes:
+#   2>Done Building Project "K:\...\BarcodeDemo.csproj" (default targets) -- FAILED.
+PROJECT_DONE_PATTERN = re.compile(r'Done Building Project "([^"]+\.csproj)" \((?:default targets|Rebuild target\(s\)|Build target\(s\))\)( -- FAILED)?\.')
+# error lines end with the project they belong to: ... error CS0246: ... [K:\...\BarcodeDemo.csproj]
+PROJECT_ERROR_PATTERN = re.compile(r':\s*error\s+[A-Z]*\d+:.*\[([^\]]+\.csproj)\]\s*$')
+
+class BatchOptions:
+    """Options for a run, filled from the command line"""
+    def __init__(self, incremental = False, maximize = True, changed_since = None, changed_until = None,
+                 prepare_workers = PREPARE_WORKERS, build_workers = 1, capture_queue_size = 2,
+                 batch_restore = True, packages_dir = None, restore_sources = (), solution_build = False,
+                 incremental_build = False, stage_timeouts = None, window_backend = None,
+                 ready_max_wait = READY_MAX_WAIT, ready_min_wait = 0, shutdown_timeout = SHUTDOWN_MAX_WAIT,
+                 capture_backend = "pyautogui", png_compress_level = PNG_COMPRESS_LEVEL, png_optimize = False,
+                 image_writers = IMAGE_WRITER_WORKERS, icons = None, prepare_only = False, plan = False,
+                 dotnet_run_baseline = None):
+        # Skip projects whose inputs haven't changed since their last successful capture
+        self.incremental = incremental
+        self.maximize = maximize
+        # Only select projects changed in git since this revision (and until changed_until, else the working tree)
+        self.changed_since = changed_since
+        self.changed_until = changed_until
+        # Concurrency: source edits (all done before the first build) and builds run on worker threads,
+        # capture has a single slot fed through a queue of capture_queue_size built projects
+        self.prepare_workers = prepare_workers
+        self.build_workers = build_workers
+        self.capture_queue_size = capture_queue_size
+        # Stop after patching the sources of every project, without building anything
+        self.prepare_only = prepare_only
+        # Only write the intended source edits as a patch and a JSON summary; no project is touched or built
+        self.plan = plan
+        # Restore all selected projects once up front; packages_dir/restore_sources
+        # point every restore (batch, per project or in the solution build) at a local
+        # package cache or offline feed
+        self.batch_restore = batch_restore
+        self.packages_dir = packages_dir
+        self.restore_sources = list(restore_sources)
+        # Build all projects in one msbuild call over a generated solution instead of one by one
+        self.solution_build = solution_build
+        # Don't force a clean/rebuild, so already patched and built projects are no-op builds
+        self.incremental_build = incremental_build
+        # Wall-clock limit per step; a step running longer has its process tree killed
+        self.stage_timeouts = dict(DEFAULT_STAGE_TIMEOUTS)
+        self.stage_timeouts.update(stage_timeouts or {})
+        # Where windows are found; None is the desktop (pygetwindow), tests pass a FakeWindowBackend
+        self.window_backend = window_backend
+        # Capture once the window stops changing, after at least ready_min_wait and at most ready_max_wait seconds
+        self.ready_max_wait = ready_max_wait
+        self.ready_min_wait = ready_min_wait
+        # Longest wait for a closed application to exit and release its outputs before it is killed
+        self.shutdown_timeout = shutdown_timeout
+        # Launch-to-window seconds of `dotnet run` that exe launches are compared against;
+        # projects of the same batch that fell back to dotnet run give a measured one instead
+        self.dotnet_run_baseline = dotnet_run_baseline
+        # Screen grabber: pyautogui, or mss when installed
+        self.capture_backend = capture_backend
+        # Screenshots are PNG-encoded on image_writers background threads
+        self.png_compress_level = png_compress_level
+        self.png_optimize = png_optimize
+        self.image_writers = image_writers
+
+        # The .ico set in each project; one icon for everything unless folders are mapped to their own
+        self.icons = icons if icons is not None else IconRegistry(ICON_PATH)
+
+    def image_writer(self):
+        return ImageWriter(self.image_writers, compress_level=self.png_compress_level, optimize=self.png_optimize)
+
+    def ready_min_wait_for(self, csproj):
+        """Minimum settle time for a project, longer for known slow-painting samples"""
+        slow = [seconds for name, seconds in SLOW_PAINTING_PROJECTS.items() if name.lower() in csproj.lower()]
+        return max([self.ready_min_wait] + slow)
+
+    def capture_settings(self):
+        """Settings that affect the captured image; part of every project fingerprint"""
+        return {
+            "maximize": self.maximize,
+            "offset": MAXIMIZED_SCREENSHOT_OFFSET if self.maximize else SCREENSHOT_OFFSET,
+        }
+
+def show_frame(frame, title):
+    """Preview a captured frame from memory instead of reading the saved PNG back"""
+    if frame.channel_order == "BGRA":
+        # OpenCV's native order; shown as is
+        cv2.imshow(title, frame.pixels)
+    else:
+        cv2.imshow(title, cv2.cvtColor(frame.pixels, cv2.COLOR_RGB2BGR))
 
 def wait_for_cv2():
     cv2.waitKey(0) 
@@ -50,63 +176,51 @@ logger.addHandler(errorLoggingHandler)
 logger.addHandler(debugLoggingHandler)
 logger.addHandler(infoLoggingHandler)
 
-def get_main_class_files(project_dir, form_name):
+def get_project_files(project_dir, index = None):
+    """Return the indexed files of project_dir, indexing just that directory if no index is given"""
+    if index is None:
+        index = WorkspaceIndex(project_dir)
+    project = index.project(project_dir)
+    if project is None:
+        raise Exception(f"No .csproj files indexed for {project_dir}")
+    return project
+
+def get_project_class_index(project_dir, index = None):
+    """Return the class symbol index of project_dir, reusing the index's analysis cache"""
+    if index is None:
+        index = WorkspaceIndex(project_dir)
+    return get_class_index(get_project_files(project_dir, index), index.analysis_cache)
+
+def get_main_class_files(project_dir, form_name, index = None):
     # given the form(eg: Form1) name and project dir
-    # return the list of files that contain the form name
-    main_class_files = []
-    for root, _, files in os.walk(project_dir):
-        for file in files:
-            if file.endswith(".cs"):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                        content = f.read()
-                        if re.search(r"class\s+" + re.escape(form_name), content):
-                            main_class_files.append(file_path)
-                except Exception as e:
-                    logger.error(f"Error reading file {file_path}: {e}")
-    return main_class_files
-
-def get_entry_cs_file(project_dir):
-    """
-    Reads Program.cs to identify the main form class instantiated in Application.Run().
-    Returns the class name string or None if not found.
+    # return the list of files that declare the form class (partial classes included)
+    return get_project_class_index(project_dir, index).files_declaring(form_name)
+
+def get_entry_cs_file(project_dir, index = None):
     """
-    program_cs_path = os.path.join(project_dir, "Program.cs")
-    if not os.path.exists(program_cs_path):
-        # Look for cs files with main method with Application.Run(new FormName)
-        # and return the form name
-        for file in os.listdir(project_dir):
-            if file.endswith(".cs"):
-                with open(os.path.join(project_dir, file), "r", encoding="utf-8-sig", errors="ignore") as f:
-                    content = f.read()
-                    match = re.search(r"Application\.Run\s*\(\s*new\s+([a-zA-Z0-9_]+)", content)
-                    if match:
-                        return file
+    Finds the file holding the entry point: Program.cs, or else the first .cs file
+    in the project directory calling Application.Run(new FormName).
+    Returns the file name or None if not found.
+    """
+    entry_file = get_project_class_index(project_dir, index).entry_file()
+    if entry_file is None:
         return None
-
-    return "Program.cs"
+    return os.path.basename(entry_file)
 
 # read program.cs and determine which form is the entry point
-def get_entry_form_name(project_dir, entry_file):
+def get_entry_form_name(project_dir, entry_file, index = None):
     """
-    Reads entry path to identify the main form class instantiated in Application.Run().
+    Looks up the main form class instantiated in Application.Run() in the entry file.
     Returns the class name string or None if not found.
     """
     if entry_file is None:
         logger.error("Entry file not found")
         raise Exception("Entry file not found")
 
-    try:
-        with open(os.path.join(project_dir, entry_file), "r", encoding="utf-8-sig", errors="ignore") as f:
-            content = f.read()
-            # Regex looks for: Application.Run(new FormName
-            match = re.search(r"Application\.Run\s*\(\s*new\s+([a-zA-Z0-9_]+)", content)
-            if match:
-                return match.group(1)
-    except Exception as e:
-        logger.error(f"Error parsing Program.cs in {project_dir}: {e}")
-        print(f"Error parsing Program.cs in {project_dir}: {e}")
+    class_index = get_project_class_index(project_dir, index)
+    form_name = class_index.entry_form(os.path.join(project_dir, entry_file))
+    if form_name:
+        return form_name
     
     print(f"Could not find entry form name in {entry_file}")
     logger.error(f"Could not find entry form name in {entry_file}")
@@ -118,46 +232,47 @@ def get_entry_form_name(project_dir, entry_file):
 #   System.ComponentModel.ComponentResourceManager resources = new System.ComponentModel.ComponentResourceManager(typeof({FormName})); # if this does not exist add it
 #   this.Icon = ((System.Drawing.Icon)(resources.GetObject("$this.Icon"))); # if this does not exist add it
 # insert the lines right after starting braces "{"
-def update_designer_file(project_dir, form_name, file = ""):
+def update_designer_file(project_dir, form_name, file = "", index = None, plan = None):
     """
     Reads the FormName.Designer.cs file and updates it to include icon setting.
     It adds 'System.ComponentModel.ComponentResourceManager resources = new System.ComponentModel.ComponentResourceManager(typeof({FormName}));'
     and 'this.Icon = ((System.Drawing.Icon)(resources.GetObject("$this.Icon")));'
     inside the InitializeComponent method if they don't already exist.
+    With a SourcePlan the edit is recorded there instead of written.
     """
-    if file.isspace():
+    if not file.strip():
         designer_file_path = os.path.join(project_dir, f"{form_name}.Designer.cs")
     else:
         designer_file_path = os.path.join(project_dir, file)
 
-    if not os.path.exists(designer_file_path):
+    project = get_project_files(project_dir, index)
+    if not project.has_file(designer_file_path):
         # check if {form_name}.cs exists and use that
-        if os.path.exists(os.path.join(project_dir, f"{form_name}.cs")):
+        if project.has_file(os.path.join(project_dir, f"{form_name}.cs")):
             designer_file_path = os.path.join(project_dir, f"{form_name}.cs")
         else:
             logger.error(f"Designer file not found for {form_name}: {designer_file_path}")
             raise Exception(f"Designer file not found for {form_name}: {designer_file_path}")
 
-    with open(designer_file_path, "r", encoding="utf-8-sig", errors="ignore") as f:
-            content = f.read()
+    with open(designer_file_path, "rb") as f:
+        original = f.read()
+    # Decoded like a text-mode read, with universal newlines
+    content = original.decode("utf-8-sig", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
 
-    # Find the InitializeComponent method
-    init_component_pattern = r"(private void InitializeComponent\s*\(\)\s*\{)([\s\S]*)(\s*\}\s*#endregion)"
-    init_component_match = re.search(init_component_pattern, content)
+    # Find the InitializeComponent body; the checks below only look inside it
+    body_span = find_method_body(content, "InitializeComponent")
 
-    if not init_component_match:
+    if body_span is None:
         logger.warning(f"InitializeComponent method not found in {designer_file_path}")
         raise Exception(f"InitializeComponent method not found in {designer_file_path}")
-        return False
 
-    before_method = content[:init_component_match.start()]
-    method_body_start = init_component_match.group(1)
-    method_body_content = init_component_match.group(2)
-    method_body_end = init_component_match.group(3)
-    after_method = content[init_component_match.end():]
+    before_method = content[:body_span[0]]
+    method_body_content = content[body_span[0]:body_span[1]]
+    after_method = content[body_span[1]:]
 
     modified = False
     lines_to_add = []
+    added = []
 
     method_body_before_content = ""
     method_body_after_content = ""
@@ -172,6 +287,7 @@ def update_designer_file(project_dir, form_name, file = ""):
         resource_manager_match = re.search(resource_manager_line_pattern, method_body_content)
         if resource_manager_match is None:
             lines_to_add.append(f"\n            {resource_manager_line}")
+            added.append("resource manager")
             modified = True
             logger.debug(f"Added ComponentResourceManager line to {designer_file_path}")
         else:
@@ -187,6 +303,7 @@ def update_designer_file(project_dir, form_name, file = ""):
     icon_line_match = re.search(icon_line_pattern, method_body_content)
     if icon_line_match is None:
         lines_to_add.append(f"\n            {icon_line}")
+        added.append("Icon")
         modified = True
         logger.debug(f"Added Icon setting line to {designer_file_path}")
     else:
@@ -198,83 +315,88 @@ def update_designer_file(project_dir, form_name, file = ""):
         method_body_after_content = method_body_content
 
     if modified:
-        new_content = before_method + method_body_start + method_body_before_content + "\n".join(lines_to_add) + method_body_after_content + method_body_end + after_method
-        with open(designer_file_path, "w", encoding="utf-8-sig") as f:
-            f.write(new_content)
+        new_content = before_method + method_body_before_content + "\n".join(lines_to_add) + method_body_after_content + after_method
+        # The bytes a text-mode write would produce
+        data = new_content.replace("\n", os.linesep).encode("utf-8-sig")
+        if plan is not None:
+            return plan.record(designer_file_path, original, data, f"InitializeComponent: added {' and '.join(added)} line")
+        write_if_changed(designer_file_path, data, original)
         logger.debug(f"Successfully updated {designer_file_path} with icon settings.")
     else:
+        # Leave the file (and its timestamp) alone so incremental builds stay no-ops
         logger.debug(f"Icon settings already present in {designer_file_path}. No changes made.")
+    return modified
 
-def kill_process_tree(pid):
-    """Kill a process and all its child processes"""
-    try:
-        parent = psutil.Process(pid)
-        children = parent.children(recursive=True)
-        
-        # Kill children first
-        for child in children:
-            try:
-                child.terminate()
-            except psutil.NoSuchProcess:
-                logger.debug(f"Child process {child.pid} already terminated.")
-                pass
-        
-        # Wait a moment for children to terminate
-        gone, still_alive = psutil.wait_procs(children, timeout=3)
-        
-        # Force kill any remaining children
-        for child in still_alive:
-            try:
-                child.kill()
-            except psutil.NoSuchProcess as e:
-                logger.debug(f"Child process {child.pid} already terminated: {e}")
-                pass
-        
-        # Kill parent
-        try:
-            parent.terminate()
-            parent.wait(3)  # Wait for parent to terminate
-        except (psutil.NoSuchProcess, psutil.TimeoutExpired):
-            try:
-                parent.kill()
-            except psutil.NoSuchProcess as e:
-                logger.debug(f"Process {pid} already terminated: {e}")
-                pass
-                
-    except psutil.NoSuchProcess as e:
-        logger.debug(f"Process {pid} already terminated: {e}")
-        pass
+def _record_output_line(line, stream_name, cwd, debug_name, context, diagnostics, on_line = None, collected = None):
+    """Log one line of a child's output, keeping only a bounded tail and the MSBuild errors"""
+    logger.debug(f"[{cwd}]-{debug_name} {stream_name}: {line}")
+    context.append(line)
+    if collected is not None:
+        collected.append(line)
+    diagnostic = MSBUILD_DIAGNOSTIC_PATTERN.search(line)
+    if diagnostic:
+        if diagnostic.group(1).lower() == "error":
+            logger.error(f"[{cwd}]-{debug_name}: {line.strip()}")
+            if len(diagnostics["errors"]) < MAX_REPORTED_ERRORS:
+                diagnostics["errors"].append(line.strip())
+        else:
+            diagnostics["warnings"] += 1
+    if on_line is not None:
+        on_line(line)
 
-def run_subprocess(command, cwd, wait = True, debug_name = "Subprocess"):
-    """Run a subprocess command with timeout and return process"""
+def run_subprocess(args, cwd, wait = True, debug_name = "Subprocess", timeout = None, on_line = None):
+    """
+    Run a subprocess from an argument list, without a shell, and return process (when not waiting).
+    Every child is owned by the process supervisor, which kills it on shutdown.
+    When waiting, stdout and stderr are streamed into the debug log line by line;
+    only the last OUTPUT_CONTEXT_LINES lines, the last STDERR_TAIL_LINES stderr lines
+    and the MSBuild error lines are kept for the failure report. on_line(line) is called for every stdout line.
+    After timeout seconds the whole process tree is killed.
+    """
+    command = subprocess.list2cmdline(args)
     try:
-        process = subprocess.Popen(
-            command, 
-            cwd=cwd, 
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        
         if(not wait):
+            process = get_supervisor().start(args, cwd, name=debug_name)
             print(f"{debug_name}[{command}] started with PID: {process.pid}")
             return process
         
-        stdout, stderr = process.communicate()
-        logger.debug(f"[{cwd}]-{debug_name}[{command}] stdout: {stdout.decode()}")
+        context = collections.deque(maxlen=OUTPUT_CONTEXT_LINES)
+        diagnostics = {"errors": [], "warnings": 0}
+        stderr_lines = collections.deque(maxlen=STDERR_TAIL_LINES)
+        stderr_count = 0
+        def on_output(stream_name, line):
+            nonlocal stderr_count
+            if stream_name == "stdout":
+                _record_output_line(line, stream_name, cwd, debug_name, context, diagnostics, on_line=on_line)
+            else:
+                stderr_count += 1
+                _record_output_line(line, stream_name, cwd, debug_name, context, diagnostics, collected=stderr_lines)
+
+        try:
+            returncode = get_supervisor().run(args, cwd, name=debug_name, timeout=timeout, on_output=on_output)
+        except subprocess.TimeoutExpired:
+            print(f"[{cwd}]-{debug_name} timed out after {timeout}s, process tree killed")
+            logger.error(f"[{cwd}]-{debug_name}[{command}] last output:\n" + "\n".join(context))
+            raise Exception(f"{debug_name}[{command}] timed out after {timeout}s")
 
-        if wait:
-            process.wait()
+        if diagnostics["errors"] or diagnostics["warnings"]:
+            logger.debug(f"[{cwd}]-{debug_name}: {len(diagnostics['errors'])} error(s), {diagnostics['warnings']} warning(s)")
 
-        if process.returncode != 0:
-            logger.error(f"{debug_name}[{command}] failed with return code: {process.returncode}")
-            print(f"[{cwd}]-{debug_name} failed with return code: {process.returncode}")
+        if returncode != 0:
+            logger.error(f"{debug_name}[{command}] failed with return code: {returncode}")
+            print(f"[{cwd}]-{debug_name} failed with return code: {returncode}")
+            logger.error(f"[{cwd}]-{debug_name}[{command}] last output:\n" + "\n".join(context))
             
+            stderr = "\n".join(stderr_lines)
+            if stderr_count > len(stderr_lines):
+                stderr = f"... {stderr_count - len(stderr_lines)} earlier stderr line(s) omitted\n" + stderr
             if stderr:
-                logger.error(f"[{cwd}]-{debug_name}[{command}] errors: {stderr.decode()}")
-                print(f"{debug_name}[{command}] errors: {stderr.decode()}")
-                raise Exception(stderr.decode())
-            raise Exception(f"{debug_name}[{command}] failed with return code: {process.returncode}")
+                logger.error(f"[{cwd}]-{debug_name}[{command}] errors: {stderr}")
+                print(f"{debug_name}[{command}] errors: {stderr}")
+                raise Exception(stderr)
+            if diagnostics["errors"]:
+                raise Exception(f"{debug_name}[{command}] failed with return code: {returncode}: " + "; ".join(diagnostics["errors"]))
+            raise Exception(f"{debug_name}[{command}] failed with return code: {returncode}")
         print(f"{debug_name} successful!")
         logger.debug(f"{debug_name} successful!")
     except Exception as e:
@@ -284,297 +406,744 @@ def run_subprocess(command, cwd, wait = True, debug_name = "Subprocess"):
 
 
 
-def build_and_run_netframework_project(project_dir, csproj):
-    """Build and run .NET Framework project"""    
+def build_netframework_project(project_dir, csproj, clean = True, timeouts = None,
+                               packages_dir = None, restore_sources = ()):
+    """
+    Clean, restore and build a .NET Framework project.
+    With clean=False the previous outputs are kept so MSBuild can skip up-to-date work.
+    timeouts maps step names (Clean, Restore, Build) to limits in seconds.
+    packages_dir and restore_sources go to dotnet restore as --packages and --source.
+    """
+    if timeouts is None:
+        timeouts = DEFAULT_STAGE_TIMEOUTS
+    toolchain = get_toolchain()
     print(f"Building project: \"{csproj}\"")
 
     # Step 1: Clean the project
-    run_subprocess(f'dotnet clean "{csproj}"', cwd=project_dir, debug_name="Clean")
+    if clean:
+        run_subprocess([toolchain.dotnet, "clean", csproj], cwd=project_dir, debug_name="Clean", timeout=timeouts.get("Clean"))
 
-    # Step 2: Restore packages
-    run_subprocess(f'dotnet restore "{csproj}"', cwd=project_dir, debug_name="Restore")
+    # Step 2: Restore packages (a no-op check when the workspace restore already covered it)
+    if restore_is_current(load_csproj(os.path.join(project_dir, csproj))):
+        print(f"Restore of \"{csproj}\" is up to date, skipping")
+        logger.debug(f"[{project_dir}]-Restore of {csproj} is up to date, skipping")
+    else:
+        args = [toolchain.dotnet, "restore", csproj]
+        if packages_dir:
+            args += ["--packages", os.path.abspath(packages_dir)]
+        for source in restore_sources:
+            args += ["--source", source]
+        run_subprocess(args, cwd=project_dir, debug_name="Restore", timeout=timeouts.get("Restore"))
 
     # Step 3: Build the project
     print(f'Building project: "{csproj}"')
-    run_subprocess(f'msbuild "{csproj}"', cwd=project_dir, debug_name="Build")
+    run_subprocess([toolchain.msbuild, csproj], cwd=project_dir, debug_name="Build", timeout=timeouts.get("Build"))
+
+def restore_workspace(jobs, workspace_dir, options):
+    """
+    Restore every project that needs it with a single `dotnet restore` over a
+    generated solution, so the shared package set is resolved once instead of
+    once per project. Failures are logged; per-project restore then takes over.
+    """
+    infos = []
+    for job in jobs:
+        info = load_csproj(os.path.join(job.project_dir, job.csproj))
+        if not restore_is_current(info) and info not in infos:
+            infos.append(info)
+    if not infos:
+        logger.debug("Workspace restore: every project is already restored")
+        return
+
+    packages = collect_package_references(infos)
+    print(f"Restoring {len(infos)} project(s) referencing {len(packages)} unique package(s) in one pass...")
+    logger.debug(f"Workspace restore of {len(infos)} project(s), unique packages: {packages}")
+
+    solution_path = write_solution(os.path.join(workspace_dir, RESTORE_SOLUTION_NAME), infos)
+    args = [get_toolchain().dotnet, "restore", solution_path]
+    if options.packages_dir:
+        # Relative to where the script was started, not the directory the restore runs in
+        args += ["--packages", os.path.abspath(options.packages_dir)]
+    for source in options.restore_sources:
+        args += ["--source", source]
+    try:
+        run_subprocess(args, cwd=workspace_dir, debug_name="Restore (workspace)",
+                       timeout=options.stage_timeouts.get("Restore (workspace)"))
+    except Exception as e:
+        logger.error(f"Workspace restore failed, projects will be restored one by one: {e}")
+        print(f"Workspace restore failed, projects will be restored one by one: {e}")
+
+def build_solution(jobs, workspace_dir, on_project_built, rebuild = True, timeout = None,
+                   packages_dir = None, restore_sources = ()):
+    """
+    Build every job's project in one `msbuild /m /restore /nodeReuse:true` call over
+    a generated solution, writing a binary log next to it. The output is read as it
+    is produced and on_project_built(job, errors) is called as soon as MSBuild reports
+    a project done; errors is the list of its error lines if it failed, else None.
+    packages_dir and restore_sources point the restore at a package cache and feeds,
+    like --packages and --source do for dotnet restore.
+    """
+    jobs_by_path = {os.path.normcase(os.path.abspath(os.path.join(job.project_dir, job.csproj))): job for job in jobs}
+    infos = [load_csproj(path) for path in jobs_by_path]
+    solution_path = write_solution(os.path.join(workspace_dir, BUILD_SOLUTION_NAME), infos)
+    binary_log_path = os.path.join(workspace_dir, BUILD_BINARY_LOG_NAME)
+    target = "Rebuild" if rebuild else "Build"
+    args = [get_toolchain().msbuild, solution_path, f"/t:{target}", "/m", "/restore",
+            "/nodeReuse:true", "/v:normal", f"/bl:{binary_log_path}"]
+    if packages_dir:
+        args.append(f"/p:RestorePackagesPath={os.path.abspath(packages_dir)}")
+    if restore_sources:
+        # ';' would start a new property on the command line, %3B is MSBuild's escaped list separator
+        args.append("/p:RestoreSources=" + "%3B".join(restore_sources))
+
+    print(f"Building {len(infos)} project(s) in one msbuild call, binary log: {binary_log_path}")
+    errors = {}
+    def on_line(line):
+        error_match = PROJECT_ERROR_PATTERN.search(line)
+        if error_match:
+            errors.setdefault(os.path.normcase(os.path.abspath(error_match.group(1))), []).append(line.strip())
+            return
+        done_match = PROJECT_DONE_PATTERN.search(line)
+        if done_match:
+            path = os.path.normcase(os.path.abspath(done_match.group(1)))
+            job = jobs_by_path.get(path)
+            if job is not None:
+                on_project_built(job, errors.get(path, ["MSBuild reported the build as failed"]) if done_match.group(2) else None)
+
+    try:
+        run_subprocess(args, cwd=workspace_dir, debug_name="Solution build", timeout=timeout, on_line=on_line)
+    except Exception as e:
+        # Projects MSBuild already reported keep their result, the rest fail in the pipeline
+        print(f"Solution build failed, see {binary_log_path}: {e}")
+
+def run_netframework_project(project_dir, csproj):
+    """
+    Start the built project without waiting for it.
+    Launches the output executable directly; `dotnet run` (which re-evaluates and
+    may rebuild the project) is only used when no executable is found.
+    Returns (process, launch method).
+    """
+    # Step 4: Run the built executable
+    executable = find_output_executable(project_dir, csproj)
+    if executable is not None:
+        return run_subprocess([executable], cwd=os.path.dirname(executable), wait=False, debug_name="Run"), "exe"
 
-    # Step 4: Dotnet run
-    return run_subprocess(f'dotnet run "{csproj}"', cwd=project_dir, wait=False, debug_name="Run")
+    logger.debug(f"[{project_dir}]-No output executable found for {csproj}, falling back to dotnet run")
+    return run_subprocess([get_toolchain().dotnet, "run", "--project", csproj], cwd=project_dir, wait=False, debug_name="Run"), "dotnet run"
+
+def build_and_run_netframework_project(project_dir, csproj):
+    """Build and run .NET Framework project"""    
+    build_netframework_project(project_dir, csproj)
+    process, _ = run_netframework_project(project_dir, csproj)
+    return process
 
 
 def find_output_executable(project_dir, csproj_filename):
-    """Find the output executable for a .NET Framework project"""
-    project_name = os.path.splitext(csproj_filename)[0]
-    
-    # Common output paths for .NET Framework projects
-    possible_paths = [
-        os.path.join(project_dir, "bin", "Debug", project_name + ".exe"),
-        os.path.join(project_dir, "bin", "Release", project_name + ".exe"),
-        os.path.join(project_dir, "bin", "Debug", project_name + ".vshost.exe"),
-        os.path.join(project_dir, "bin", "Release", project_name + ".vshost.exe"),
-    ]
-    
-    for path in possible_paths:
-        if os.path.exists(path):
-            return path
-    
-    # If not found, try to find any .exe in bin directories
-    bin_debug_path = os.path.join(project_dir, "bin", "Debug")
-    bin_release_path = os.path.join(project_dir, "bin", "Release")
-    
-    for bin_path in [bin_debug_path, bin_release_path]:
-        if os.path.exists(bin_path):
-            for file in os.listdir(bin_path):
-                if file.endswith('.exe') and not file.endswith('.vshost.exe'):
-                    return os.path.join(bin_path, file)
-    
-    return None
+    """
+    Find the output executable for a .NET Framework project.
+    The path comes from the csproj's AssemblyName, OutputType, OutputPath and
+    TargetFramework; returns None for libraries or when the build produced no exe.
+    """
+    try:
+        executable = load_csproj(os.path.join(project_dir, csproj_filename)).output_executable
+    except Exception as e:
+        logger.error(f"Could not read {csproj_filename} in {project_dir}: {e}")
+        return None
 
-def detect_new_window(existing_titles, retry_count = 0, max_retries = 250):
-    if retry_count >= max_retries:
-        print("Error: Maximum retries reached while detecting new window.")
-        raise Exception("Maximum retries reached while detecting new window.")
-    
-    retry_count += 1
-    current_titles = set(gw.getAllTitles())
-    # Find titles that are in 'current' but were not in 'existing'
-    new_titles = [t for t in (current_titles - existing_titles) if t.strip()]
+    if executable is None or not os.path.isfile(executable):
+        logger.debug(f"Output executable not found for {csproj_filename}: {executable}")
+        return None
+    return executable
 
-    target_window = None
+def detect_new_window(existing_windows, app_process = None, backend = None, timeout = WINDOW_DETECT_TIMEOUT):
+    """
+    Wait for the launched application's window. existing_windows is the backend's
+    snapshot from before launch; with app_process, only windows owned by its process
+    tree are accepted. Returns (window, number of polls); raises on timeout.
+    """
+    if backend is None:
+        backend = get_window_backend()
+    owner_pids = app_process.tree_pids if app_process is not None else None
+    target_window, polls = wait_for_new_window(backend, existing_windows, owner_pids, timeout)
+    print(f"--- Selected application window: '{target_window.title}' ---")
+    return target_window, polls
 
-    if not new_titles:
-        time.sleep(0.2)
-        return detect_new_window(existing_titles, retry_count, max_retries)
-    
-    # Filter out irrelevant windows
-    filtered_titles = [
-        t for t in new_titles 
-        if t and not any(sys_word in t for sys_word in 
-            ['OleMainThreadWndName', 'MSCTFIME UI', 'Default IME', 'ConsoleWindowClass'])
-    ]
-    
-    if filtered_titles:
-        title = filtered_titles[0]
-        print(f"--- Selected application window: '{title}' ---")
-        try:
-            target_window = gw.getWindowsWithTitle(title)[0]
-        except IndexError:
-            print(f"Window with title '{title}' not found, trying first available...")
-            if new_titles:
-                target_window = gw.getWindowsWithTitle(new_titles[0])[0]
-            else:
-                print("No windows found")
-    else:
-        print("No suitable windows found after filtering")
+def screenshot_region(target_window, maximize = True):
+    """Screen region of the window without its border, read fresh since it moves while maximizing"""
+    screenshot_offset_x = SCREENSHOT_OFFSET
+    screenshot_offset_y = SCREENSHOT_OFFSET
+    if maximize:
+        screenshot_offset_x = MAXIMIZED_SCREENSHOT_OFFSET
+        screenshot_offset_y = MAXIMIZED_SCREENSHOT_OFFSET
+    return (
+        target_window.left + screenshot_offset_x, 
+        target_window.top + screenshot_offset_y, 
+        target_window.width - screenshot_offset_x*2, 
+        target_window.height - screenshot_offset_y * 2
+    )
 
-    if target_window is not None:
-        return target_window
-    
-    time.sleep(0.2)
-    return detect_new_window(existing_titles, retry_count, max_retries)
+def wait_for_window_ready(target_window, capture, maximize = True, max_wait = READY_MAX_WAIT, min_wait = 0, stable_frames = READY_STABLE_FRAMES):
+    """
+    Wait until the window's contents stop changing instead of sleeping a fixed time.
+    Returns the last frame once it is stable, so it can be used as the screenshot, else None.
+    """
+    last = {}
+    def grab():
+        last["frame"] = capture.grab(screenshot_region(target_window, maximize))
+        return last["frame"].pixels
+    stable, waited, frames = wait_until_stable(grab, stable_frames=stable_frames, max_wait=max_wait, min_wait=min_wait)
+    if stable:
+        logger.debug(f"Window '{target_window.title}' stable after {waited:.2f}s ({frames} frames)")
+        return last["frame"]
+    state = "still blank" if "frame" in last and last["frame"].is_blank() else "still changing"
+    logger.info(f"Window '{target_window.title}' {state} after {waited:.2f}s ({frames} frames), capturing anyway")
+    print(f"Window {state} after {waited:.2f}s, capturing anyway")
+    return None
 
-def bring_window_to_front_take_screenshot(target_window, csproj, maximize = True):
+def bring_window_to_front_take_screenshot(target_window, csproj, maximize = True, ready_max_wait = READY_MAX_WAIT, ready_min_wait = 0,
+                                          capture = None, writer = None, on_saved = None):
+    """
+    Capture the window and return the screenshot path. With a writer the PNG is
+    encoded in the background and on_saved(path, error) is called once it is written.
+    """
     if target_window is None:
         logger.debug("No target window to bring to front.")
         return
+    if capture is None:
+        capture = get_capture_backend()
     
     if not target_window.isActive:
         try:
             target_window.activate()
-            time.sleep(1)  # Give more time for window activation
         except Exception as e:
             logger.error(f"Warning: Could not force focus to window. Attempting capture anyway. ({e})") 
             print(f"Warning: Could not force focus to window. Attempting capture anyway. ({e})")
 
     if maximize:
         target_window.maximize()
-    time.sleep(2)
+    frame = None
+    try:
+        frame = wait_for_window_ready(target_window, capture, maximize, ready_max_wait, ready_min_wait)
+    except Exception as e:
+        logger.error(f"Readiness check failed, capturing anyway: {e}")
     
-    # Step 4: Take screenshot
+    # Step 4: Take screenshot (the last stable frame already is one)
     print("--- Capturing Screenshot ---")
-    screenshot_offset_x = 4
-    screenshot_offset_y = 4
-    if maximize:
-        screenshot_offset_x = 14
-        screenshot_offset_y = 14
     try:
-        screenshot = pyautogui.screenshot(region=(
-            target_window.left + screenshot_offset_x, 
-            target_window.top + screenshot_offset_y, 
-            target_window.width - screenshot_offset_x*2, 
-            target_window.height - screenshot_offset_y * 2
-        ))
+        if frame is None:
+            frame = capture.grab(screenshot_region(target_window, maximize))
+        if frame.is_blank():
+            logger.error(f"Screenshot of {csproj} is a single color, the window may not have painted")
+            print(f"Warning: screenshot of {csproj} is a single color, the window may not have painted")
         # Step 5: Save with project name for uniqueness
         save_path = os.path.join(csproj, "screenshot.png")
-        screenshot.save(save_path)
-        logger.debug(f"Screenshot saved to: {save_path}")
-        show_image(save_path)
+        if writer is not None:
+            writer.submit(frame, save_path, on_saved)
+        else:
+            frame.to_image().save(save_path)
+            logger.debug(f"Screenshot saved to: {save_path}")
+            if on_saved is not None:
+                on_saved(save_path, None)
+        show_frame(frame, save_path)
+        return save_path
     except Exception as e:
         logger.error(f"Failed to capture screenshot: {e}")    
         print(f"Failed to capture screenshot: {e}")
         return
 
 def close_application(target_window):
+    """Ask the window to close; returns True if the request was sent"""
     print("--- Closing application ---")
     if target_window:
         try:
             # Try to close the window gracefully first
             target_window.close()
             logger.debug("Sent close signal to application window.")    
-            time.sleep(2)
+            return True
         except Exception as e:
             logger.error(f"Warning: Could not close window gracefully: {e}")    
             print(f"Warning: Could not close window gracefully: {e}")
-    return 
+    return False
 
-def process_single_project(project_dir):
-    """Process a single project directory - runs the application and captures screenshot"""
-    print(f"--- Processing project in {project_dir} ---")
-    logger.debug(f"Processing project in {project_dir}")
+def wait_for_app_shutdown(job, app_process, target_window, closed, backend, timeout = SHUTDOWN_MAX_WAIT):
+    """
+    Wait until the application's process tree has exited, its window is gone and its
+    build outputs are no longer locked, so the next project can start right away.
+    If the window was never closed, or the app is still running after timeout seconds,
+    its process tree is killed and the remaining conditions get another timeout.
+    """
+    files = []
+    try:
+        files = output_files(load_csproj(os.path.join(job.project_dir, job.csproj)))
+    except Exception as e:
+        logger.debug(f"[{job.project_dir}]-Could not list the outputs of {job.csproj}: {e}")
+    conditions = {
+        "process tree exited": app_process.exited,
+        "outputs unlocked": lambda: first_locked_file(files) is None,
+    }
+    if target_window is not None:
+        conditions["window closed"] = lambda: not backend.is_open(target_window)
 
-    successCount = 0
-    failedCount = 0
+    started = time.perf_counter()
+    pending = list(conditions)
+    if closed:
+        pending, _ = wait_for_conditions(conditions, timeout)
+    if "process tree exited" in pending:
+        logger.debug(f"[{job.project_dir}]-Killing process tree for PID: {app_process.pid}")    
+        print("--- Killing process tree...---")
+        get_supervisor().terminate(app_process)
+    if pending:
+        pending, _ = wait_for_conditions({name: conditions[name] for name in pending}, timeout)
+    job.shutdown_seconds = time.perf_counter() - started
+    if pending:
+        logger.error(f"[{job.csproj}][{job.project_dir}]-Still waiting for {', '.join(pending)} after {job.shutdown_seconds:.2f}s, moving on")
+        print(f"Still waiting for {', '.join(pending)} after {job.shutdown_seconds:.2f}s, moving on")
+    else:
+        logger.debug(f"[{job.csproj}][{job.project_dir}]-Application shut down in {job.shutdown_seconds:.2f}s")
 
-    # Verify path exists
-    if not os.path.exists(project_dir):
-        logger.error(f"Directory not found: {project_dir}") 
-        print(f"Error: Directory not found: {project_dir}")
-        failedCount += 1
-        return successCount, failedCount
+_project_locks = {}
+_project_locks_lock = threading.Lock()
 
-    # Verify it's a .NET project (look for .csproj files)
-    csproj_files = [f for f in os.listdir(project_dir) if f.endswith('.csproj')]
-    if not csproj_files:
-        print(f"Warning: No .csproj files found in {project_dir}, skipping...")
-        logger.error(f"No .csproj files found in {project_dir}, skipping...") 
-        failedCount += 1
-        return successCount, failedCount
+def project_lock(project_dir):
+    """Lock serializing work on one project directory (several .csproj may share it)"""
+    with _project_locks_lock:
+        return _project_locks.setdefault(os.path.normcase(os.path.abspath(project_dir)), threading.Lock())
+
+def prepare_project_sources(job, index, options, fingerprints = None, plan = None):
+    """
+    Prepare stage: skip an unchanged project in incremental mode, otherwise
+    set the icon in the entry form's resx and designer files (or record the
+    edits in plan without writing them).
+    """
+    project_dir = job.project_dir
+    csproj = job.csproj
+    project = get_project_files(project_dir, index)
+
+    if options.incremental and fingerprints is not None:
+        fingerprint = project_fingerprint(project, csproj, options.icons.icon_for(project_dir), options.capture_settings(), index.analysis_cache)
+        if fingerprints.is_current(project_dir, csproj, fingerprint):
+            job.skipped = True
+            return
+
+    entry_cs_file = get_entry_cs_file(project_dir, index)
+    main_form_name = get_entry_form_name(project_dir, entry_cs_file, index)
+
+    if main_form_name is None:
+        logger.error(f"Could not find entry form name for {csproj}, skipping...")
+        raise Exception(f"Could not find entry form name for {csproj}")
+    job.main_form_name = main_form_name
+
+    class_index = get_project_class_index(project_dir, index)
+    main_class_files = class_index.designer_candidates(main_form_name)
+    
+    logger.debug(f"[{csproj}]-Updating resx file for {main_form_name}...")
+    print(f'    [{csproj}]-Updating resx file for {main_form_name}...')
+    # Cheap to create: the icon is encoded once per process
+    updater = ResxIconUpdater(options.icons.icon_for(project_dir), plan)
+    try:
+        job.patched_files += updater.search_and_update(project_dir, [f"{main_form_name}.resx"], index)
+    except Exception as e:
+        worked = False
+        for resx_file in class_index.resx_candidates(main_form_name):
+            try:
+                print(f"updating {resx_file}")
+                if updater.update_resx_file(resx_file):
+                    job.patched_files.append(resx_file)
+                worked = True
+                break
+            except Exception as e1:
+                logger.error(f"[fallback] Could not update resx file {resx_file}: {e1}")
+                print(f"[fallback] Could not update resx file {resx_file}: {e1}")
+                pass
+        if not worked:
+            logger.error(f"Could not update resx file for in {",".join(main_class_files)} files: {e}")
+            print(f"Could not update resx file for in {",".join(main_class_files)} files: {e}")
+            raise Exception(f"Could not update resx file for in {",".join(main_class_files)} files: {e}")
+
+    # Try the designer file first, then the other files declaring the form
+    worked = False
+    last_error = None
+    for file in main_class_files:
+        try:
+            if update_designer_file(project_dir, main_form_name, file = file, index = index, plan = plan):
+                job.patched_files.append(os.path.join(project_dir, file))
+            worked = True
+            print(f"updated designer file for {file}")
+            break
+        except Exception as e1:
+            last_error = e1
+            logger.error(f"[fallback] Could not update designer file for {file}: {e1}")
+            print(f"[fallback] Could not update designer file for {file}: {e1}")
+            pass
+    if not worked:
+        logger.error(f"Could not update designer file for in {",".join(main_class_files)} files: {last_error}")
+        raise Exception(f"Could not update designer file for in {",".join(main_class_files)} files: {last_error}")
+
+def prepare_result(job):
+    """(result, details) of a prepared job for the prepare report"""
+    if job.error is not None:
+        return "failed", str(job.error)
+    if job.skipped:
+        return "unchanged", "matches its last screenshot"
+    if job.patched_files:
+        return "patched", ", ".join(os.path.basename(path) for path in job.patched_files)
+    return "up-to-date", ""
+
+def prepare_workspace(jobs, index, options, fingerprints = None, plan = None):
+    """
+    Prepare stage for the whole batch, before anything is built: patch the resx and
+    designer files of every job on options.prepare_workers threads. A job that can't
+    be prepared is failed in the Prepare stage, so it is never built or launched.
+    With a SourcePlan nothing is written; the edits are recorded in it instead.
+    Returns {result: number of jobs} for the results of prepare_result.
+    """
+    pending = [job for job in jobs if not job.prepared and not job.finished]
+    started = time.perf_counter()
+
+    def prepare(job):
+        try:
+            with project_lock(job.project_dir):
+                prepare_project_sources(job, index, options, fingerprints, plan)
+        except Exception as e:
+            job.error = e
+            job.failed_stage = "Prepare"
+        job.prepared = True
+
+    with ThreadPoolExecutor(max_workers=max(1, options.prepare_workers), thread_name_prefix="Prepare") as executor:
+        # list() re-raises anything prepare() let through, e.g. KeyboardInterrupt
+        list(executor.map(prepare, pending))
+
+    results = collections.Counter(prepare_result(job)[0] for job in pending)
+    report_prepare_results(pending, time.perf_counter() - started)
+    return results
+
+def plan_workspace(jobs, index, options, workspace_dir, fingerprints = None):
+    """
+    --plan: run the prepare analysis over every job without writing to any project,
+    and save the intended edits as one unified diff plus a JSON summary in workspace_dir.
+    Returns the summary.
+    """
+    plan = SourcePlan(workspace_dir)
+    prepare_workspace(jobs, index, options, fingerprints, plan)
+    patch_path = os.path.join(workspace_dir, PLAN_PATCH_NAME)
+    summary_path = os.path.join(workspace_dir, PLAN_SUMMARY_NAME)
+    summary = plan.save(patch_path, summary_path, jobs, prepare_result)
+    projects = sum(1 for project in summary["projects"] if project["edits"])
+    print(f"\nPlan: {summary['files_changed']} file(s) in {projects} project(s) would change; nothing was written or built.")
+    print(f"  Patch:   {patch_path}")
+    print(f"  Summary: {summary_path}")
+    logger.info(f"Plan: {summary['files_changed']} file(s) in {projects} project(s) would change, results {summary['results']}")
+    return summary
+
+def report_prepare_results(jobs, seconds):
+    """Print and log one row per prepared project: what was patched, or why it failed"""
+    if not jobs:
+        return
+    rows = [(prepare_result(job), os.path.join(job.project_dir, job.csproj)) for job in jobs]
+    width = max(len(result) for (result, _), _ in rows)
+    print(f"\nPrepared {len(jobs)} project(s) in {seconds:.1f}s:")
+    for (result, details), project in sorted(rows, key=lambda row: (row[0][0] != "failed", row[1])):
+        print(f"  {result:<{width}}  {project}" + (f": {details}" if details else ""))
+        logger.info(f"[Prepare] {result}: {project}" + (f": {details}" if details else ""))
+    counts = collections.Counter(result for (result, _), _ in rows)
+    summary = ", ".join(f"{count} {result}" for result, count in sorted(counts.items()))
+    print(f"Prepare summary: {summary}")
+    logger.info(f"Prepare summary: {summary} in {seconds:.1f}s")
+
+def capture_project(job, index, options, fingerprints = None, writer = None):
+    """
+    Capture stage: launch the built application, screenshot its window and close it.
+    Only one capture runs at a time since it needs the screen; the PNG is written by
+    writer in the background when one is given.
+    """
+    project_dir = job.project_dir
+    csproj = job.csproj
 
     # --- STEP 0: Snapshot existing windows before launching ---
     print("--- Scanning existing windows... ---")
-    existing_titles = set(gw.getAllTitles())
-    logger.debug(f"Existing window titles: {existing_titles}")
-    process = None
-    
-    # Step 1: Try to run the .NET Framework project
-    print(f"Attempting to build and run .NET Framework projects...")
-    logger.debug(f"Attempting to build and run .NET Framework projects...")
-    csproj_files = [f for f in os.listdir(project_dir) if f.endswith('.csproj')]
-    
-    if len(csproj_files) == 0:
-        logger.error(f"No .csproj files found in {project_dir}, skipping...")
-        failedCount += 1
-        return successCount, failedCount
-    
-    for csproj in csproj_files:
-        app_process = None
+    backend = options.window_backend or get_window_backend()
+    existing_windows = backend.snapshot()
+    logger.debug(f"{len(existing_windows)} window(s) open before launch")
+
+    app_process = None
+    target_window = None
+    closed = False
+    try:
+        launch_started = time.perf_counter()
+        app_process, job.launch_method = run_netframework_project(project_dir, csproj)
+
+        print("--- Detecting new application window... ---" )
+        logger.debug(f"[{csproj}]-Detecting new application window... ---" )
+        detect_started = time.perf_counter()
         try:
-            entry_cs_file = get_entry_cs_file(project_dir)
-            main_form_name = get_entry_form_name(project_dir, entry_cs_file)
-            main_class_files = get_main_class_files(project_dir, main_form_name)
-
-            if main_form_name is None:
-                logger.error(f"Could not find entry form name for {csproj}, skipping...")
-                failedCount += 1
-                raise Exception(f"Could not find entry form name for {csproj}")
-            
-            logger.debug(f"[{csproj}]-Updating resx file for {main_form_name}...")
-            print(f'    [{csproj}]-Updating resx file for {main_form_name}...')
-            try:
-                ResxIconUpdater('C1.ico').search_and_update(project_dir, [f"{main_form_name}.resx"])
-            except Exception as e:
-                worked = False
-                for file in main_class_files:
-                    try:
-                        # file (eg: Form1.cs). Convert to `Form1.resx`
-                        print(f"updating {file.replace('.cs', '.resx')}")
-                        ResxIconUpdater('C1.ico').search_and_update(project_dir, [file.replace('.cs', '.resx')])
-                        worked = True
-                        break
-                    except Exception as e1:
-                        logger.error(f"[fallback] Could not update resx file for {file}: {e1}")
-                        print(f"[fallback] Could not update resx file for {file}: {e1}")
-                        pass
-                if not worked:
-                    logger.error(f"Could not update resx file for in {",".join(main_class_files)} files: {e}")
-                    print(f"Could not update resx file for in {",".join(main_class_files)} files: {e}")
-                    raise Exception(f"Could not update resx file for in {",".join(main_class_files)} files: {e}")
-
-            # Designer file not found
-            try:
-                update_designer_file(project_dir, main_form_name, file = main_class_files[0])
-            except Exception as e:
-                worked = False
-                for file in main_class_files:
-                    try:
-                        update_designer_file(project_dir, main_form_name, file = file)
-                        worked = True
-                        print(f"updated designer file for {file}")
-                        break
-                    except Exception as e1:
-                        logger.error(f"[fallback] Could not update designer file for {file}: {e1}")
-                        print(f"[fallback] Could not update designer file for {file}: {e1}")
-                        pass
-                if not worked:
-                    logger.error(f"Could not update designer file for in {",".join(main_class_files)} files. e: {e}")
-                    raise Exception(f"Could not update designer file for in {",".join(main_class_files)} files. e: {e}")
-            app_process = build_and_run_netframework_project(project_dir, csproj)
-
-            print("--- Detecting new application window... ---" )
-            logger.debug(f"[{csproj}]-Detecting new application window... ---" )
-            target_window = detect_new_window(existing_titles)
-            
-            if target_window is None:
-                logger.error(f"Could not detect application window for project {csproj}, skipping screenshot...")
-                print(f"Could not detect application window for project {csproj}, skipping screenshot...")
-                failedCount += 1
-                continue
+            target_window, polls = detect_new_window(existing_windows, app_process, backend)
+        except Exception as e:
+            logger.error(f"Could not detect application window for project {csproj}, skipping screenshot... ({e})")
+            print(f"Could not detect application window for project {csproj}, skipping screenshot... ({e})")
+            raise Exception(f"Could not detect application window for project {csproj}: {e}")
+        job.detect_seconds = time.perf_counter() - detect_started
+        job.launch_seconds = time.perf_counter() - launch_started
+        print(f"Window detected in {job.detect_seconds:.2f}s ({polls} poll(s)), {job.launch_seconds:.2f}s after launch")
+        logger.info(f"[{csproj}][{project_dir}]-Window appeared {job.launch_seconds:.2f}s after launch ({job.launch_method}), "
+                    f"detection took {job.detect_seconds:.2f}s over {polls} poll(s)")
+
+        fingerprint = None
+        if fingerprints is not None:
+            # Fingerprint the patched sources so an untouched project matches next time
+            fingerprint = project_fingerprint(get_project_files(project_dir, index), csproj, options.icons.icon_for(project_dir),
+                                              options.capture_settings(), index.analysis_cache)
+        def on_saved(path, error):
+            if error is not None:
+                job.error = error
+                job.failed_stage = "Write"
+            elif fingerprint is not None:
+                # Only once the PNG is on disk, or an incremental run would skip a missing screenshot
+                fingerprints.record(project_dir, csproj, fingerprint)
+
+        job.screenshot_path = bring_window_to_front_take_screenshot(target_window, project_dir, options.maximize,
+                                                                    options.ready_max_wait, options.ready_min_wait_for(csproj),
+                                                                    get_capture_backend(options.capture_backend),
+                                                                    writer, on_saved)
+        print("--- Closing application... ---")
+        closed = close_application(target_window)
+    finally:
+        print("--- Waiting for the application to shut down... ---")
+        logger.debug(f"[{project_dir}]-Waiting for the application to shut down...")
+        if(app_process is not None):
+            wait_for_app_shutdown(job, app_process, target_window, closed, backend, options.shutdown_timeout)
+
+def run_project_jobs(jobs, index, options, fingerprints = None, writer = None):
+    """
+    Prepare every job's sources (unless prepare_workspace already did), then run
+    them through the build -> capture pipeline. Builds run on worker threads while
+    the calling thread captures, so project k+1 is compiling while project k is on
+    screen. A build keeps its project directory locked until the job's capture and
+    shutdown are done, so a sibling .csproj is not rebuilt under the running app.
+    Screenshots are encoded by writer (a private one if None), which is
+    flushed before returning. Returns (successCount, failedCount, skippedCount).
+    """
+    prepare_workspace(jobs, index, options, fingerprints)
+    own_writer = writer is None
+    if own_writer:
+        writer = options.image_writer()
+    counts = {"success": 0, "failed": 0, "skipped": 0, "done": 0}
+    # id(job) -> the project lock its build took; released by capture on the calling thread.
+    # Captures take jobs in completion order and never wait for a lock, so this can't deadlock.
+    held_locks = {}
 
-            bring_window_to_front_take_screenshot(target_window, project_dir)
-            print("--- Closing application... ---")
-            close_application(target_window)
-            successCount += 1
+    def build(job):
+        lock = project_lock(job.project_dir)
+        lock.acquire()
+        held_locks[id(job)] = lock
+        build_netframework_project(job.project_dir, job.csproj, clean=not options.incremental_build,
+                                   timeouts=options.stage_timeouts, packages_dir=options.packages_dir,
+                                   restore_sources=options.restore_sources)
+
+    def capture(job):
+        try:
+            capture_job(job)
+        finally:
+            lock = held_locks.pop(id(job), None)
+            if lock is not None:
+                lock.release()
+
+    def capture_job(job):
+        counts["done"] += 1
+        csproj = job.csproj
+        project_dir = job.project_dir
+        print(f"\n{'='*60}")
+        print(f"Project {counts['done']}/{len(jobs)}: {csproj} ({project_dir})")
+        print(f"{'='*60}")
+
+        if job.skipped:
+            print(f"--- {csproj} unchanged since its last screenshot, skipping ---")
+            logger.info(f"[{csproj}][{project_dir}]-Unchanged since last capture, skipped")
+            counts["skipped"] += 1
+            return
+        if job.error is not None:
+            logger.error(f"[{csproj}][{project_dir}]-Build/Run failed for {csproj}: {job.error}")   
+            print(f"Build/Run failed for {csproj} ({job.failed_stage}): {job.error}")
+            counts["failed"] += 1
+            return
+
+        try:
+            capture_project(job, index, options, fingerprints, writer)
+            counts["success"] += 1
             logger.info(f"[{csproj}][{project_dir}]-Build/Run successful for {csproj}")
         except Exception as e:
             logger.error(f"[{csproj}][{project_dir}]-Build/Run failed for {csproj}: {e}")   
             print(f"Build/Run failed for {csproj}: {e}")
-            failedCount += 1
-            continue
-        finally:
-            print("--- Cleaning up stray processes... ---")
-            logger.debug(f"[{project_dir}]-Cleaning up stray processes...")
-            if(app_process is not None):
-                logger.debug(f"[{project_dir}]-Killing process tree for PID: {app_process.pid}")    
-                print("--- Killing process tree...---")
-                kill_process_tree(app_process.pid)
-    return successCount, failedCount  
-
-def cleanup_stray_processes(project_dir):
-    """Clean up any stray processes that might still be running"""
+            job.error = e
+            job.failed_stage = "Capture"
+            counts["failed"] += 1
+
+    def build_all(pending, emit):
+        def on_project_built(job, errors):
+            if errors:
+                job.error = Exception("; ".join(errors))
+                job.failed_stage = "Build"
+            emit(job)
+        build_solution(pending, index.root, on_project_built, rebuild=not options.incremental_build,
+                       timeout=options.stage_timeouts.get("Solution build"),
+                       packages_dir=options.packages_dir, restore_sources=options.restore_sources)
+
+    if options.solution_build:
+        build_stage = BatchStage("Build", build_all)
+    else:
+        build_stage = Stage("Build", build, options.build_workers)
     try:
-        project_name = os.path.basename(project_dir)
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+        run_pipeline(jobs, [build_stage], capture, options.capture_queue_size)
+    finally:
+        for lock in list(held_locks.values()):
+            lock.release()
+        held_locks.clear()
+        if own_writer:
+            writer.close()
+        else:
+            writer.flush()
+    # Captures whose PNG could not be written were counted as successful
+    write_failures = sum(1 for job in jobs if job.failed_stage == "Write")
+    counts["success"] -= write_failures
+    counts["failed"] += write_failures
+    report_launch_times(jobs, options.dotnet_run_baseline)
+    report_failures(jobs)
+    return counts["success"], counts["failed"], counts["skipped"]
+
+def report_failures(jobs):
+    """List every failed project with the stage it failed in"""
+    failed_jobs = [job for job in jobs if job.error is not None]
+    if not failed_jobs:
+        return
+    print(f"\nFailed projects ({len(failed_jobs)}):")
+    for job in failed_jobs:
+        print(f"  [{job.failed_stage or 'Capture'}] {os.path.join(job.project_dir, job.csproj)}: {job.error}")
+        logger.error(f"[{job.csproj}][{job.project_dir}]-Failed in {job.failed_stage or 'Capture'} stage: {job.error}")
+
+def report_launch_times(jobs, dotnet_run_baseline = None):
+    """
+    Log window detection latency per project, launch-to-window latency per launch method
+    and the time saved by launching the exe directly. The saving needs a dotnet run
+    baseline: the average of this batch's dotnet run launches, else dotnet_run_baseline.
+    """
+    latencies = {}
+    for job in jobs:
+        if job.launch_seconds is not None:
+            latencies.setdefault(job.launch_method, []).append(job.launch_seconds)
+            logger.info(f"[{job.csproj}][{job.project_dir}]-Window detection {job.detect_seconds:.2f}s, launch to window {job.launch_seconds:.2f}s")
+    averages = {method: sum(values) / len(values) for method, values in latencies.items()}
+    for method, average in averages.items():
+        print(f"Launch via {method}: {len(latencies[method])} project(s), {average:.2f}s average until the window appeared")
+        logger.info(f"Launch via {method}: {len(latencies[method])} project(s), {average:.2f}s average until the window appeared")
+    shutdowns = [job.shutdown_seconds for job in jobs if job.shutdown_seconds is not None]
+    if shutdowns:
+        print(f"Applications shut down in {sum(shutdowns) / len(shutdowns):.2f}s on average (longest {max(shutdowns):.2f}s)")
+        logger.info(f"Applications shut down in {sum(shutdowns) / len(shutdowns):.2f}s on average (longest {max(shutdowns):.2f}s)")
+    if "exe" not in averages:
+        return
+    baseline = averages.get("dotnet run", dotnet_run_baseline)
+    if baseline is None:
+        print("Time saved over dotnet run not reported: no project fell back to it and --dotnet-run-baseline is not set")
+        logger.info("Time saved over dotnet run not reported: no project fell back to it and --dotnet-run-baseline is not set")
+        return
+    source = "measured" if "dotnet run" in averages else "configured"
+    for job in jobs:
+        if job.launch_method == "exe" and job.launch_seconds is not None:
+            logger.info(f"[{job.csproj}][{job.project_dir}]-Launching the exe saved about {baseline - job.launch_seconds:.2f}s "
+                        f"over the {source} dotnet run baseline of {baseline:.2f}s")
+    saved = baseline - averages["exe"]
+    print(f"Launching the exe directly saved about {saved:.2f}s per project ({saved * len(latencies['exe']):.1f}s in total, "
+          f"{source} dotnet run baseline {baseline:.2f}s)")
+    logger.info(f"Launching the exe directly saved about {saved:.2f}s per project ({saved * len(latencies['exe']):.1f}s in total, "
+                f"{source} dotnet run baseline {baseline:.2f}s)")
+
+def create_project_jobs(project_dirs, index):
+    """
+    One job per application .csproj in project_dirs. Library projects are left out
+    before anything is built. Returns (jobs, number of unreadable .csproj files).
+    """
+    jobs = []
+    failed = 0
+    for project_dir in project_dirs:
+        project = index.project(project_dir)
+        if project is None:
+            logger.error(f"No .csproj files found in {project_dir}, skipping...")
+            continue
+        for csproj in project.csproj_files:
             try:
-                # Look for processes that might be related to our project
-                cmdline = proc.info['cmdline'] or []
-                if any(project_name in str(arg) for arg in cmdline):
-                    logger.debug(f"Found stray process related to project: {proc.info['pid']} - terminating")
-                    print(f"Found stray process related to project: {proc.info['pid']} - terminating")
-                    proc.terminate()
-            except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
-                logger.error(f"Error accessing process info: {e}")
+                info = load_csproj(os.path.join(project_dir, csproj))
+            except Exception as e:
+                logger.error(f"[{csproj}][{project_dir}]-Could not parse {csproj}: {e}")
+                print(f"Could not parse {csproj}: {e}")
+                failed += 1
+                continue
+            if not info.is_executable:
+                logger.debug(f"[{csproj}][{project_dir}]-Skipping {info.output_type} project")
+                print(f"Skipping {csproj}: OutputType is {info.output_type}, nothing to run")
+                continue
+            jobs.append(ProjectJob(project_dir, csproj))
+    return jobs, failed
 
-    except Exception as e:
-        logger.error(f"Error during stray process cleanup: {e}")    
-        print(f"Error during stray process cleanup: {e}")
+def is_project_dir(project_dir, index):
+    """True when project_dir exists and holds a .csproj; prints and logs why not otherwise"""
+    # Verify path exists
+    if not os.path.exists(project_dir):
+        logger.error(f"Directory not found: {project_dir}") 
+        print(f"Error: Directory not found: {project_dir}")
+        return False
+
+    # Verify it's a .NET project (look for .csproj files)
+    project = index.project(project_dir)
+    csproj_files = project.csproj_files if project is not None else []
+    if not csproj_files:
+        print(f"Warning: No .csproj files found in {project_dir}, skipping...")
+        logger.error(f"No .csproj files found in {project_dir}, skipping...") 
+        return False
+    return True
+
+def process_single_project(project_dir, index = None, options = None, fingerprints = None):
+    """
+    Process a single project directory - runs the application and captures screenshot.
+    Returns (successCount, failedCount, skippedCount); projects are only skipped in
+    incremental mode when their fingerprint matches the last successful capture.
+    """
+    print(f"--- Processing project in {project_dir} ---")
+    logger.debug(f"Processing project in {project_dir}")
+
+    if options is None:
+        options = BatchOptions()
+    if index is None and os.path.exists(project_dir):
+        index = WorkspaceIndex(project_dir)
+    if not is_project_dir(project_dir, index):
+        return 0, 1, 0
+
+    print(f"Attempting to build and run .NET Framework projects...")
+    logger.debug(f"Attempting to build and run .NET Framework projects...")
+    jobs, failed = create_project_jobs([project_dir], index)
+    successCount, failedCount, skippedCount = run_project_jobs(jobs, index, options, fingerprints)
+    return successCount, failedCount + failed, skippedCount
 
-def find_cs_projects(main_directory):
-    """Find all CS project directories within the main directory structure"""    
+def find_cs_projects(main_directory, index = None, changed_since = None, changed_until = None):
+    """
+    Find all CS project directories within the main directory structure.
+    With changed_since, only projects touched in git since that revision (until changed_until,
+    or the working tree) are returned, plus the projects referencing them.
+    """    
     print(f"Scanning main directory: {main_directory}")
-    return [str(path.parent) for path in Path(main_directory).rglob("*.csproj")]
+    if index is None:
+        index = WorkspaceIndex(main_directory)
+    projects = index.project_dirs()
+    if changed_since is None:
+        return projects
+
+    changed = changed_project_dirs(index, changed_since, changed_until, OUTPUT_FILE_NAMES)
+    print(f"{len(changed)} of {len(projects)} project(s) changed since {changed_since}")
+    logger.debug(f"{len(changed)} of {len(projects)} project(s) changed since {changed_since}")
+    return [project_dir for project_dir in projects if project_dir in changed]
     
-def run_for_all_projects():
+def run_for_all_projects(options = None):
     """Main function to process all projects"""
+    if options is None:
+        options = BatchOptions()
+
     # Get the main directory from user input
     MAIN_DIR = input("Enter the main directory path: ").strip().strip('"').strip("'")
     
@@ -584,8 +1153,15 @@ def run_for_all_projects():
         print(f"Error: Main directory not found: {MAIN_DIR}")
         return
     
-    # Find all CS projects
-    projects = find_cs_projects(MAIN_DIR)
+    # Find all CS projects (one directory scan shared by every later step)
+    index = WorkspaceIndex(MAIN_DIR, AnalysisCache.for_workspace(MAIN_DIR))
+    fingerprints = FingerprintStore.for_workspace(MAIN_DIR)
+    try:
+        projects = find_cs_projects(MAIN_DIR, index, options.changed_since, options.changed_until)
+    except Exception as e:
+        logger.error(f"Could not select changed projects: {e}")
+        print(f"Error: Could not select changed projects: {e}")
+        return
     
     if not projects:
         logger.error("No C# projects found in the directory structure.")
@@ -601,49 +1177,157 @@ def run_for_all_projects():
     print(f"\nStarting batch processing...")
     logger.debug("Starting batch processing...")
     
-    successful = 0
-    failed = 0
-    
-    for i, project_dir in enumerate(projects, 1):
-        print(f"\n{'='*60}")
-        print(f"Processing project {i}/{len(projects)}: {os.path.basename(project_dir)}")
-        print(f"{'='*60}")
-        
+    jobs, failed = create_project_jobs(projects, index)
+    if options.plan:
         try:
-            successCount, failedCount = process_single_project(project_dir)
-            successful += successCount
-            failed += failedCount
-        except Exception as e:
-            failed += 1
-            continue
-        
-        # Longer delay between projects to ensure clean shutdown
-        time.sleep(5)
+            plan_workspace(jobs, index, options, MAIN_DIR, fingerprints)
+        finally:
+            index.analysis_cache.save()
+        return
+    # Patch every project before the first build, so the ones that can't be patched are known up front
+    try:
+        prepared = prepare_workspace(jobs, index, options, fingerprints)
+    finally:
+        index.analysis_cache.save()
+    if options.prepare_only:
+        logger.debug(f"Prepare only: {dict(prepared)}, {failed} unreadable project file(s)")
+        print(f"Prepare only, nothing built. {failed} project file(s) could not be read.")
+        return
+    if options.batch_restore and not options.solution_build:
+        # The solution build restores as part of its single msbuild call
+        restore_workspace([job for job in jobs if not job.finished], MAIN_DIR, options)
+    writer = options.image_writer()
+    try:
+        successful, failed_jobs, skipped = run_project_jobs(jobs, index, options, fingerprints, writer)
+        failed += failed_jobs
+    finally:
+        # Never exit with screenshots still being written
+        written, write_failed = writer.flush()
+        writer.close()
+        logger.debug(f"Image writer: {written} screenshot(s) written, {write_failed} failed")
+        # Persist parsed facts even when the batch is interrupted
+        index.analysis_cache.save()
     print(f"\n{'='*60}")
     print(f"Batch processing completed!")
     print(f"Successful: {successful}")
     print(f"Failed: {failed}")
+    print(f"Skipped (unchanged): {skipped}")
     print(f"Total: {len(projects)}")
     print(f"{'='*60}")
-    logger.debug(f"Batch processing completed! Successful: {successful}, Failed: {failed}, Total: {len(projects)}")
-    print(f"Batch processing completed! Successful: {successful}, Failed: {failed}, Total: {len(projects)}")
+    logger.debug(f"Batch processing completed! Successful: {successful}, Failed: {failed}, Skipped: {skipped}, Total: {len(projects)}")
+    print(f"Batch processing completed! Successful: {successful}, Failed: {failed}, Skipped: {skipped}, Total: {len(projects)}")
     print("Waiting for all the processes to exit...")
     wait_for_cv2()
 
 
 def exit_gracefully(signum, frame):
-    logger.debug("Received termination signal. Exiting gracefully...")
-    print("\nReceived termination signal. Exiting gracefully...")
-    exit(0)
+    """Cancel running steps and tear down every build and application before exiting"""
+    logger.debug(f"Received signal {signum}. Stopping all child processes...")
+    print("\nReceived termination signal. Stopping builds and applications...")
+    started = time.perf_counter()
+    stopped = get_supervisor().shutdown()
+    logger.debug(f"Stopped {stopped} child process tree(s) in {time.perf_counter() - started:.2f}s")
+    print(f"Stopped {stopped} child process tree(s). Exiting.")
+    exit(128 + signum)
+
+def parse_options():
+    parser = argparse.ArgumentParser(description="Set the C1 icon on WinForms samples, build them and capture screenshots")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip projects whose sources, icon and capture settings are unchanged since their last screenshot")
+    parser.add_argument("--changed-since", metavar="REV",
+                        help="batch mode: only process projects changed in git since REV (e.g. the last release tag); "
+                             "compares with the working tree unless --changed-until is given. Use HEAD for uncommitted changes")
+    parser.add_argument("--changed-until", metavar="REV",
+                        help="end revision for --changed-since")
+    parser.add_argument("--prepare-workers", type=int, default=PREPARE_WORKERS, metavar="N",
+                        help=f"number of threads patching resx/designer files before the builds start (default: {PREPARE_WORKERS})")
+    parser.add_argument("--prepare-only", action="store_true",
+                        help="batch mode: patch the resx/designer files of every project, print the results and stop before building")
+    parser.add_argument("--plan", action="store_true",
+                        help=f"write every intended resx/designer edit to {PLAN_PATCH_NAME} (unified diff) and "
+                             f"{PLAN_SUMMARY_NAME} in the workspace (or project) directory instead of applying it; nothing is built")
+    parser.add_argument("--build-workers", type=int, default=1, metavar="N",
+                        help="number of projects cleaned, restored and built in parallel (default: 1)")
+    parser.add_argument("--capture-queue", type=int, default=2, metavar="N",
+                        help="number of built projects waiting for the single capture slot (default: 2)")
+    parser.add_argument("--no-batch-restore", action="store_true",
+                        help="restore each project separately instead of all at once before building")
+    parser.add_argument("--packages", metavar="DIR",
+                        help="NuGet package cache directory for restores")
+    parser.add_argument("--restore-source", action="append", default=[], metavar="FEED",
+                        help="NuGet source (e.g. an offline feed) for restores; can be repeated")
+    parser.add_argument("--solution-build", action="store_true",
+                        help="build all selected projects in one msbuild /m /restore /nodeReuse:true call over a generated "
+                             "solution (with a binary log) and capture each project as soon as it is built")
+    parser.add_argument("--incremental-build", action="store_true",
+                        help="skip the forced clean (or rebuild in --solution-build) and let MSBuild build only what changed")
+    parser.add_argument("--stage-timeout", action="append", default=[], metavar="STEP=SECONDS",
+                        help="wall-clock limit for a step, e.g. Build=900 or Restore=0 for no limit; steps: "
+                             + ", ".join(DEFAULT_STAGE_TIMEOUTS) + "; can be repeated")
+    parser.add_argument("--ready-timeout", type=float, default=READY_MAX_WAIT, metavar="SECONDS",
+                        help=f"longest wait for a window to stop changing before it is captured (default: {READY_MAX_WAIT})")
+    parser.add_argument("--ready-min-wait", type=float, default=0, metavar="SECONDS",
+                        help="shortest wait before a window counts as ready (default: 0; known slow-painting samples wait longer)")
+    parser.add_argument("--shutdown-timeout", type=float, default=SHUTDOWN_MAX_WAIT, metavar="SECONDS",
+                        help=f"longest wait for a closed application to exit and unlock its outputs before it is killed (default: {SHUTDOWN_MAX_WAIT})")
+    parser.add_argument("--dotnet-run-baseline", type=float, metavar="SECONDS",
+                        help="launch-to-window time of `dotnet run` to report the time saved by launching the exe directly; "
+                             "without it only the launch-to-window latency is reported, unless some project fell back to dotnet run")
+    parser.add_argument("--capture-backend", choices=CAPTURE_BACKENDS, default="pyautogui",
+                        help="screen grabber used for readiness checks and screenshots (default: pyautogui; mss is faster if installed)")
+    parser.add_argument("--png-compression", type=int, choices=range(10), default=PNG_COMPRESS_LEVEL, metavar="0-9",
+                        help=f"PNG zlib level: 0 is fastest and largest, 9 smallest and slowest (default: {PNG_COMPRESS_LEVEL})")
+    parser.add_argument("--png-optimize", action="store_true",
+                        help="let Pillow search for the smallest PNG encoding (still lossless, noticeably slower)")
+    parser.add_argument("--image-writers", type=int, default=IMAGE_WRITER_WORKERS, metavar="N",
+                        help=f"threads encoding and writing screenshots in the background (default: {IMAGE_WRITER_WORKERS})")
+    parser.add_argument("--icon", default=ICON_PATH, metavar="ICO",
+                        help=f"icon set in every project without a folder-specific one (default: {ICON_PATH})")
+    parser.add_argument("--icon-map", metavar="JSON",
+                        help="JSON object mapping product folders to their own .ico files, e.g. "
+                             "{\"NetFramework/Barcode\": \"icons/Barcode.ico\"}; paths are relative to the JSON file")
+    args = parser.parse_args()
+    if args.changed_until and not args.changed_since:
+        parser.error("--changed-until requires --changed-since")
+    try:
+        icons = IconRegistry.from_file(args.icon_map, args.icon) if args.icon_map else IconRegistry(args.icon)
+    except (OSError, ValueError) as e:
+        parser.error(f"could not read --icon-map {args.icon_map}: {e}")
+    stage_timeouts = {}
+    for value in args.stage_timeout:
+        step, _, seconds = value.partition("=")
+        if step not in DEFAULT_STAGE_TIMEOUTS or not seconds.isdigit():
+            parser.error(f"invalid --stage-timeout {value!r}")
+        stage_timeouts[step] = int(seconds) or None
+    return BatchOptions(incremental=args.incremental, changed_since=args.changed_since, changed_until=args.changed_until,
+                        prepare_workers=args.prepare_workers, build_workers=args.build_workers,
+                        capture_queue_size=args.capture_queue, batch_restore=not args.no_batch_restore,
+                        packages_dir=args.packages, restore_sources=args.restore_source,
+                        solution_build=args.solution_build, incremental_build=args.incremental_build,
+                        stage_timeouts=stage_timeouts, ready_max_wait=args.ready_timeout,
+                        ready_min_wait=args.ready_min_wait, shutdown_timeout=args.shutdown_timeout,
+                        capture_backend=args.capture_backend, png_compress_level=args.png_compression,
+                        png_optimize=args.png_optimize, image_writers=args.image_writers, icons=icons,
+                        prepare_only=args.prepare_only, plan=args.plan, dotnet_run_baseline=args.dotnet_run_baseline)
 
 if __name__ == "__main__":
     signal.signal(signal.SIGTERM, exit_gracefully)
+    signal.signal(signal.SIGINT, exit_gracefully)
+    options = parse_options()
+    if not options.plan:
+        # A plan builds nothing, so it can be made without the .NET toolchain
+        try:
+            print(f"Toolchain: {get_toolchain().describe()}")
+        except Exception as e:
+            logger.error(f"Toolchain resolution failed: {e}")
+            print(f"Toolchain resolution failed: {e}")
+            exit(1)
     # Ask user if they want to process single project or batch
     choice = input("Choose mode:\n1 - Single project (original behavior)\n2 - Batch process all projects in directory\nEnter choice (1 or 2): ").strip()
     logger.debug(f"Script started in mode: {choice}")
 
     if choice == "2":
-        run_for_all_projects()
+        run_for_all_projects(options)
     else:
         # Original single project functionality
         PROJECT_DIR = input("Enter the full path to your project directory: ").strip().strip('"').strip("'")
@@ -651,5 +1335,15 @@ if __name__ == "__main__":
         # PROJECT_DIR = Path(r"K:\Source Clone Items\Winforms Code base (Samples)-Source Clone\NetFramework\Barcode\CS\BarcodeDemo")
         # PROJECT_DIR = "K:\Source Clone Items\Winforms Code base (Samples)-Source Clone\NetFramework\Barcode\CS\BarcodeDemo".strip().strip('"').strip("'")
         logger.debug(f"Processing single project: {PROJECT_DIR}")
-        process_single_project(PROJECT_DIR)
+        index = WorkspaceIndex(PROJECT_DIR, AnalysisCache.for_workspace(PROJECT_DIR))
+        try:
+            if options.plan:
+                if not is_project_dir(PROJECT_DIR, index):
+                    exit(1)
+                jobs, _ = create_project_jobs([PROJECT_DIR], index)
+                plan_workspace(jobs, index, options, PROJECT_DIR, FingerprintStore.for_workspace(PROJECT_DIR))
+            else:
+                process_single_project(PROJECT_DIR, index, options, FingerprintStore.for_workspace(PROJECT_DIR))
+        finally:
+            index.analysis_cache.save()
         wait_for_cv2()
@@ -0,0 +1,157 @@
+import queue
+import threading
+import logging
+
+logger = logging.getLogger("msBuildScript")
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class ProjectJob:
+    """One .csproj travelling through the pipeline stages"""
+    def __init__(self, project_dir, csproj):
+        self.project_dir = project_dir
+        self.csproj = csproj
+        self.main_form_name = None
+        # Set by the prepare stage: source files it rewrote (empty when already up to date)
+        self.prepared = False
+        self.patched_files = []
+        self.screenshot_path = None
+        self.launch_method = None
+        self.launch_seconds = None
+        self.detect_seconds = None
+        self.shutdown_seconds = None
+        self.skipped = False
+        self.error = None
+        self.failed_stage = None
+
+    @property
+    def finished(self):
+        """True once the job was skipped or failed; later stages pass it through untouched"""
+        return self.skipped or self.error is not None
+
+
+class Stage:
+    """A pipeline step run by `workers` threads"""
+    def __init__(self, name, function, workers = 1):
+        self.name = name
+        self.function = function
+        self.workers = max(1, workers)
+
+
+class BatchStage(Stage):
+    """
+    A pipeline step that handles all of its jobs in one call, e.g. a single msbuild
+    over every project. function(jobs, emit) calls emit(job) as each job completes,
+    so the next stage can start on it before the whole batch is done.
+    """
+    def __init__(self, name, function):
+        super().__init__(name, function, workers=1)
+
+
+def _fail(job, stage, error):
+    job.error = error
+    job.failed_stage = stage.name
+    logger.debug(f"[{job.csproj}]-{stage.name} stage failed: {error}")
+
+
+def _run_batch(stage, inbox, outbox):
+    pending = []
+    while True:
+        job = inbox.get()
+        if job is _DONE:
+            break
+        if job.finished:
+            outbox.put(job)
+        else:
+            pending.append(job)
+    if not pending:
+        return
+
+    emitted = set()
+    def emit(job):
+        if id(job) not in emitted:
+            emitted.add(id(job))
+            outbox.put(job)
+
+    try:
+        stage.function(pending, emit)
+    except Exception as e:
+        for job in pending:
+            if id(job) not in emitted and job.error is None:
+                _fail(job, stage, e)
+    for job in pending:
+        if id(job) not in emitted:
+            if job.error is None:
+                _fail(job, stage, Exception(f"{stage.name} finished without a result for {job.csproj}"))
+            outbox.put(job)
+
+
+def _run_stage(stage, inbox, outbox, remaining):
+    if isinstance(stage, BatchStage):
+        _run_batch(stage, inbox, outbox)
+    else:
+        while True:
+            job = inbox.get()
+            if job is _DONE:
+                break
+            if not job.finished:
+                try:
+                    stage.function(job)
+                except Exception as e:
+                    _fail(job, stage, e)
+            outbox.put(job)
+    # The last worker of a stage closes the next stage's input
+    with remaining["lock"]:
+        remaining["count"] -= 1
+        if remaining["count"] == 0:
+            for _ in range(remaining["next_workers"]):
+                outbox.put(_DONE)
+
+
+def run_pipeline(jobs, stages, sink, queue_size = 2):
+    """
+    Push jobs through the worker stages and hand every job, in completion order,
+    to sink(job) on the calling thread. Queues between stages are bounded by
+    queue_size, so fast stages cannot run arbitrarily far ahead of the sink.
+    The sink runs on one thread only, which makes it the single GUI/capture slot.
+    """
+    inboxes = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    results = queue.Queue(maxsize=max(1, queue_size))
+    threads = []
+    for i, stage in enumerate(stages):
+        outbox = inboxes[i + 1] if i + 1 < len(stages) else results
+        remaining = {
+            "lock": threading.Lock(),
+            "count": stage.workers,
+            "next_workers": stages[i + 1].workers if i + 1 < len(stages) else 1,
+        }
+        for n in range(stage.workers):
+            thread = threading.Thread(target=_run_stage, args=(stage, inboxes[i], outbox, remaining),
+                                      name=f"{stage.name}-{n + 1}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    def feed():
+        for job in jobs:
+            inboxes[0].put(job)
+        for _ in range(stages[0].workers):
+            inboxes[0].put(_DONE)
+
+    feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+    feeder.start()
+
+    while True:
+        try:
+            # A timed wait keeps the main thread responsive to SIGINT/SIGTERM on Windows
+            job = results.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if job is _DONE:
+            break
+        sink(job)
+
+    feeder.join()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,117 @@
+import os
+import signal
+import subprocess
+import logging
+
+logger = logging.getLogger("msBuildScript")
+
+IS_WINDOWS = os.name == "nt"
+
+if IS_WINDOWS:
+    import ctypes
+    from ctypes import wintypes
+
+    _kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    _kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+    _kernel32.CreateJobObjectW.argtypes = [wintypes.LPVOID, wintypes.LPCWSTR]
+    _kernel32.OpenProcess.restype = wintypes.HANDLE
+    _kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    _kernel32.AssignProcessToJobObject.argtypes = [wintypes.HANDLE, wintypes.HANDLE]
+    _kernel32.TerminateJobObject.argtypes = [wintypes.HANDLE, wintypes.UINT]
+    _kernel32.QueryInformationJobObject.argtypes = [wintypes.HANDLE, ctypes.c_int, wintypes.LPVOID,
+                                                    wintypes.DWORD, ctypes.POINTER(wintypes.DWORD)]
+    _kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+
+    PROCESS_TERMINATE = 0x0001
+    PROCESS_SET_QUOTA = 0x0100
+    JOB_OBJECT_BASIC_ACCOUNTING_INFORMATION = 1
+
+    class _JobAccounting(ctypes.Structure):
+        _fields_ = [
+            ("TotalUserTime", ctypes.c_int64),
+            ("TotalKernelTime", ctypes.c_int64),
+            ("ThisPeriodTotalUserTime", ctypes.c_int64),
+            ("ThisPeriodTotalKernelTime", ctypes.c_int64),
+            ("TotalPageFaultCount", wintypes.DWORD),
+            ("TotalProcesses", wintypes.DWORD),
+            ("ActiveProcesses", wintypes.DWORD),
+            ("TotalTerminatedProcesses", wintypes.DWORD),
+        ]
+
+
+def new_group_options():
+    """Popen/create_subprocess_exec keyword arguments that start a child in its own process group"""
+    if IS_WINDOWS:
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+class ProcessGroup:
+    """
+    A spawned child together with everything it starts: a POSIX process group
+    (the child leads a new session) or a Windows job object. The whole group is
+    signalled with one call, without enumerating any processes.
+    Processes a child starts before it is assigned to its job on Windows are not
+    covered; supported is False when no group could be set up at all.
+    """
+    def __init__(self, pid, name):
+        self.pid = pid
+        self.name = name
+        self._job = None
+        self.supported = True
+        if IS_WINDOWS:
+            self._job = _kernel32.CreateJobObjectW(None, None)
+            process = _kernel32.OpenProcess(PROCESS_TERMINATE | PROCESS_SET_QUOTA, False, pid)
+            assigned = bool(self._job) and bool(process) and _kernel32.AssignProcessToJobObject(self._job, process)
+            if process:
+                _kernel32.CloseHandle(process)
+            if not assigned:
+                logger.debug(f"{name}[{pid}] could not be put in a job object: {ctypes.get_last_error()}")
+                self.close()
+                self.supported = False
+
+    def is_alive(self):
+        """True while any process of the group is still running"""
+        if not self.supported:
+            return False
+        if IS_WINDOWS:
+            if self._job is None:
+                return False
+            info = _JobAccounting()
+            if not _kernel32.QueryInformationJobObject(self._job, JOB_OBJECT_BASIC_ACCOUNTING_INFORMATION,
+                                                       ctypes.byref(info), ctypes.sizeof(info), None):
+                return False
+            return info.ActiveProcesses > 0
+        try:
+            os.killpg(self.pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # A member changed its credentials; it still exists
+            return True
+
+    def terminate(self):
+        """Ask every process in the group to exit (a hard stop on Windows, where jobs have no soft signal)"""
+        self._signal(signal.SIGTERM if not IS_WINDOWS else None)
+
+    def kill(self):
+        self._signal(signal.SIGKILL if not IS_WINDOWS else None)
+
+    def _signal(self, signum):
+        if not self.supported:
+            return
+        if IS_WINDOWS:
+            if self._job is not None:
+                _kernel32.TerminateJobObject(self._job, 1)
+            return
+        try:
+            os.killpg(self.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def close(self):
+        """Release the job handle; the processes themselves are left alone"""
+        if self._job:
+            _kernel32.CloseHandle(self._job)
+            self._job = None
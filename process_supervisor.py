@@ -0,0 +1,346 @@
+import asyncio
+import concurrent.futures
+import queue
+import subprocess
+import threading
+import logging
+import psutil
+from process_groups import ProcessGroup, new_group_options
+
+logger = logging.getLogger("msBuildScript")
+
+# Longest line read from a child's output; MSBuild can print very long command lines
+STREAM_LINE_LIMIT = 1024 * 1024
+# How long shutdown waits for cancelled steps to finish
+DRAIN_SECONDS = 5
+# How long a step keeps collecting output after its child exited; a grandchild still
+# holding the pipes after that only has the rest of its output logged
+DRAIN_SETTLE_SECONDS = 0.2
+
+# Polling interval while waiting for a process group to empty
+GROUP_POLL_SECONDS = 0.02
+
+# Polling interval while waiting for a child to exit
+EXIT_POLL_SECONDS = 0.05
+
+# Lines of output a step may have waiting for the calling thread; when they pile up
+# the step stops reading its pipes, so a chatty child blocks instead of filling memory
+LINE_QUEUE_SIZE = 10000
+LINE_QUEUE_POLL_SECONDS = 0.01
+
+# Marks the end of a child's output
+_END = object()
+
+
+class ProcessCancelled(Exception):
+    """Raised to a caller whose child was torn down because the supervisor is shutting down"""
+
+
+def terminate_tree(pid, grace_seconds):
+    """
+    Terminate pid and all of its descendants, then kill whatever is left after grace_seconds.
+    Only used for children that could not be given their own process group.
+    """
+    try:
+        parent = psutil.Process(pid)
+        processes = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    for process in processes:
+        try:
+            process.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    _, alive = psutil.wait_procs(processes, timeout=grace_seconds)
+    for process in alive:
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            pass
+    if alive:
+        psutil.wait_procs(alive, timeout=grace_seconds)
+
+
+async def _wait_exit(process):
+    # Process.wait() also waits for the pipes to close, which never happens while a
+    # surviving grandchild (e.g. an MSBuild node) holds them; the exit code is set as
+    # soon as the child itself is reaped
+    while process.returncode is None:
+        await asyncio.sleep(EXIT_POLL_SECONDS)
+    return process.returncode
+
+
+class SupervisedProcess:
+    """A child started without waiting for it; usable from any thread"""
+    def __init__(self, supervisor, process, name):
+        self._supervisor = supervisor
+        self._process = process
+        self.name = name
+        self.pid = process.pid
+        self.group = ProcessGroup(process.pid, name)
+
+    @property
+    def returncode(self):
+        return self._process.returncode
+
+    def poll(self):
+        return self._process.returncode
+
+    def exited(self):
+        """True once the child has exited and nothing is left in its process group"""
+        return self._process.returncode is not None and not self.group.is_alive()
+
+    def tree_pids(self):
+        """PIDs of the child and its descendants that are still running; empty once it exited"""
+        if self._process.returncode is not None:
+            return set()
+        try:
+            parent = psutil.Process(self.pid)
+            return {self.pid} | {child.pid for child in parent.children(recursive=True)}
+        except psutil.NoSuchProcess:
+            return set()
+
+    def wait(self, timeout = None):
+        """Wait for the child to exit; raises subprocess.TimeoutExpired like Popen.wait"""
+        future = asyncio.run_coroutine_threadsafe(_wait_exit(self._process), self._supervisor._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise subprocess.TimeoutExpired(self.name, timeout)
+
+
+class ProcessSupervisor:
+    """
+    Owns every child process the script starts. Children run on an asyncio loop in a
+    background thread: each one gets a deadline, its output is drained without blocking
+    the caller, and shutdown() cancels all running steps and tears down every process
+    tree concurrently instead of leaving builds and applications orphaned.
+    """
+    def __init__(self, grace_seconds = 3):
+        self.grace_seconds = grace_seconds
+        self._loop = asyncio.new_event_loop()
+        # The registry of everything this run started, only touched on the loop thread:
+        # running children by PID, and process groups whose leader exited but which
+        # still have members (e.g. MSBuild nodes kept alive for reuse)
+        self._children = {}
+        self._lingering = {}
+        self._tasks = set()
+        # Output readers left behind on pipes held by a finished step's descendants
+        self._detached = set()
+        self._closing = False
+        self._thread = threading.Thread(target=self._loop.run_forever, name="process-supervisor", daemon=True)
+        self._thread.start()
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def _spawn(self, args, cwd, name):
+        if self._closing:
+            raise ProcessCancelled(f"{name} was not started, shutting down")
+        self._prune()
+        process = await asyncio.create_subprocess_exec(
+            *args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, limit=STREAM_LINE_LIMIT,
+            **new_group_options())
+        child = SupervisedProcess(self, process, name)
+        self._children[child.pid] = child
+        logger.debug(f"[{cwd}]-{name} started with PID: {child.pid}")
+        return child
+
+    async def _drain(self, stream, stream_name, on_output, backlog = None):
+        """Read stream line by line into on_output(stream_name, line), pausing while backlog() is true"""
+        while True:
+            while backlog is not None and backlog():
+                await asyncio.sleep(LINE_QUEUE_POLL_SECONDS)
+            try:
+                raw_line = await stream.readline()
+            except ValueError:
+                # Line longer than STREAM_LINE_LIMIT; take what is buffered and go on
+                raw_line = await stream.read(STREAM_LINE_LIMIT)
+            if not raw_line:
+                break
+            on_output(stream_name, raw_line.decode(errors="replace").rstrip("\r\n"))
+
+    async def _wait_group(self, group, grace_seconds):
+        deadline = self._loop.time() + grace_seconds
+        while group.is_alive():
+            if self._loop.time() >= deadline:
+                return False
+            await asyncio.sleep(GROUP_POLL_SECONDS)
+        return True
+
+    async def _stop_group(self, group, grace_seconds):
+        """Signal the whole group at once, escalating to a kill after grace_seconds"""
+        group.terminate()
+        if not await self._wait_group(group, grace_seconds):
+            logger.debug(f"{group.name}[{group.pid}] ignored termination, killing its process group")
+            group.kill()
+            await self._wait_group(group, grace_seconds)
+        group.close()
+
+    async def _watch(self, child, on_output):
+        """Drain a started child's output and release it once it exited"""
+        asyncio.ensure_future(self._drain(child._process.stdout, "stdout", on_output))
+        asyncio.ensure_future(self._drain(child._process.stderr, "stderr", on_output))
+        await _wait_exit(child._process)
+        # Unless terminate() already dropped it
+        if self._children.get(child.pid) is child:
+            self._release(child)
+
+    def _prune(self):
+        """Release exited children and close groups that have emptied since"""
+        for child in list(self._children.values()):
+            if child.returncode is not None:
+                self._release(child)
+        for pid, group in list(self._lingering.items()):
+            if not group.is_alive():
+                group.close()
+                del self._lingering[pid]
+
+    def _release(self, child):
+        """Drop a finished child from the registry, keeping its group while members are left"""
+        self._children.pop(child.pid, None)
+        if child.group.is_alive():
+            self._lingering[child.pid] = child.group
+        else:
+            child.group.close()
+
+    async def _terminate(self, child, grace_seconds = None):
+        if grace_seconds is None:
+            grace_seconds = self.grace_seconds
+        if child.group.supported:
+            await self._stop_group(child.group, grace_seconds)
+        else:
+            # psutil waits block, so a tree without a group is torn down on a worker thread
+            await asyncio.to_thread(terminate_tree, child.pid, grace_seconds)
+        self._children.pop(child.pid, None)
+        self._lingering.pop(child.pid, None)
+
+    async def _run(self, args, cwd, name, timeout, lines):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        child = None
+        drains = []
+        detached = False
+        # Lines read so far, to tell a pipe that went idle from a caller that is behind
+        received = 0
+        # The calling thread empties the queue; while it is behind the pipes are left unread
+        backlog = lambda: not detached and lines.qsize() >= LINE_QUEUE_SIZE
+        def on_output(stream_name, line):
+            nonlocal received
+            received += 1
+            if detached:
+                logger.debug(f"[{cwd}]-{name}[{child.pid}] {stream_name} (after exit): {line}")
+            else:
+                lines.put((stream_name, line))
+        try:
+            child = await self._spawn(args, cwd, name)
+            drains = [asyncio.ensure_future(self._drain(child._process.stdout, "stdout", on_output, backlog)),
+                      asyncio.ensure_future(self._drain(child._process.stderr, "stderr", on_output, backlog))]
+            try:
+                await asyncio.wait_for(_wait_exit(child._process), timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"[{cwd}]-{name} (PID {child.pid}) exceeded its {timeout}s deadline, killing process tree")
+                await self._terminate(child)
+                raise subprocess.TimeoutExpired(name, timeout)
+            return child._process.returncode
+        except asyncio.CancelledError:
+            if child is not None and not self._closing:
+                await self._terminate(child)
+            raise ProcessCancelled(f"{name} was cancelled")
+        finally:
+            if drains:
+                # What the child wrote is already buffered; pipes that stay open and idle belong to a descendant
+                pending = drains
+                while pending:
+                    seen = received
+                    _, pending = await asyncio.wait(pending, timeout=DRAIN_SETTLE_SECONDS)
+                    if received == seen and not backlog():
+                        break
+                if pending:
+                    detached = True
+                    logger.debug(f"[{cwd}]-{name} (PID {child.pid}) exited but a descendant still holds its output, logging the rest")
+                    for drain in pending:
+                        self._detached.add(drain)
+                        drain.add_done_callback(self._detached.discard)
+            if child is not None:
+                self._release(child)
+            self._tasks.discard(task)
+            lines.put(_END)
+
+    def run(self, args, cwd, name = "Subprocess", timeout = None, on_output = None):
+        """
+        Run args to completion and return its exit code. on_output(stream_name, line) is
+        called on the calling thread for every line of stdout/stderr as it arrives.
+        Raises subprocess.TimeoutExpired after timeout seconds (the process tree is killed
+        first) and ProcessCancelled if the supervisor shuts down meanwhile.
+        """
+        lines = queue.SimpleQueue()
+        future = self._submit(self._run(args, cwd, name, timeout, lines))
+        error = None
+        while True:
+            item = lines.get()
+            if item is _END:
+                break
+            if on_output is not None and error is None:
+                try:
+                    on_output(*item)
+                except Exception as e:
+                    # Keep emptying the queue so the step is not left waiting on it
+                    error = e
+        if error is not None:
+            raise error
+        return future.result()
+
+    def start(self, args, cwd, name = "Subprocess"):
+        """Start args without waiting; its output goes to the debug log"""
+        child = self._submit(self._spawn(args, cwd, name)).result()
+        log_output = lambda stream_name, line: logger.debug(f"[{cwd}]-{name}[{child.pid}] {stream_name}: {line}")
+        self._submit(self._watch(child, log_output))
+        return child
+
+    def terminate(self, child, grace_seconds = None):
+        """Tear down a child's whole process tree"""
+        self._submit(self._terminate(child, grace_seconds)).result()
+
+    async def _shutdown(self, grace_seconds):
+        self._closing = True
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if grace_seconds is None:
+            grace_seconds = self.grace_seconds
+        # Only what is still running counts; an exited child's PID may already belong to someone else
+        self._prune()
+        children = list(self._children.values())
+        lingering = list(self._lingering.values())
+        self._lingering.clear()
+        # Every group is signalled up front and all of them are waited on together
+        await asyncio.gather(*(self._terminate(child, grace_seconds) for child in children),
+                             *(self._stop_group(group, grace_seconds) for group in lingering),
+                             return_exceptions=True)
+        if tasks:
+            await asyncio.wait(tasks, timeout=DRAIN_SECONDS)
+        for drain in list(self._detached):
+            drain.cancel()
+        return len(children) + len(lingering)
+
+    def shutdown(self, grace_seconds = None):
+        """
+        Refuse new children, cancel every running step and tear down all process groups
+        this run started, including leftovers of finished steps, at once. Returns the
+        number of groups that were still running.
+        """
+        return self._submit(self._shutdown(grace_seconds)).result()
+
+
+_supervisor = None
+_supervisor_lock = threading.Lock()
+
+def get_supervisor():
+    """The supervisor owning every child of this run"""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = ProcessSupervisor()
+        return _supervisor
@@ -1,74 +1,238 @@
 import xml.etree.ElementTree as ET
 import base64
+import json
 import os
+import re
 import sys
+import threading
+from workspace_index import WorkspaceIndex, normalize_path
 
-class ResxIconUpdater:
-    def __init__(self, icon_path):
-        self.icon_path = icon_path
-        self.encoded_icon = self._get_encoded_icon()
+VALUE_CHUNK_SIZE = 80
+VALUE_LINE_PREFIX = '\n        '
+VALUE_END = '\n    '
+
+# Comments are matched too so that a commented-out $this.Icon is skipped in the same pass
+ICON_DATA_START_PATTERN = re.compile(rb"""<!--.*?-->|<data\s[^>]*?\bname\s*=\s*["']\$this\.Icon["'][^>]*>""", re.S)
+VALUE_PATTERN = re.compile(rb'<value>(.*?)</value>', re.S)
+ICON_DATA_ATTRIBUTES = b'type="System.Drawing.Icon, System.Drawing" mimetype="application/x-microsoft.net.object.bytearray.base64"'
+
+def write_if_changed(file_path, data, original = None):
+    """
+    Write data to file_path unless the file already holds exactly these bytes, so an
+    unchanged file keeps its timestamp and MSBuild's incremental build stays a no-op.
+    Returns True if the file was written.
+    """
+    if original is None and os.path.exists(file_path):
+        with open(file_path, 'rb') as f:
+            original = f.read()
+    if original == data:
+        return False
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    return True
+
+def set_icon_in_tree(original, value_text):
+    """
+    Set $this.Icon by parsing the whole resx with ElementTree and serializing it again.
+    Drops comments and formatting, but copes with any well-formed file.
+    Returns (data, action) with action "updated", "added" or "unchanged".
+    """
+    root = ET.fromstring(original)
+    found = False
+    unchanged = True
+    # Replace Icon
+    for item in root.iter('data'):
+        if item.attrib.get('name') == '$this.Icon':
+            found = True
+            if item.find('value').text != value_text:
+                item.find('value').text = value_text
+                unchanged = False
+
+    if found:
+        if unchanged:
+            return original, "unchanged"
+        return ET.tostring(root, encoding='utf-8', xml_declaration=True), "updated"
+    # Add a new data element
+    new_data = ET.SubElement(root, 'data', name='$this.Icon')
+    new_data.set('type', 'System.Drawing.Icon, System.Drawing')
+    new_data.set('mimetype', 'application/x-microsoft.net.object.bytearray.base64')
+    new_value = ET.SubElement(new_data, 'value')
+    new_value.text = value_text
+    return ET.tostring(root, encoding='utf-8', xml_declaration=True), "added"
+
+
+def splice_icon_value(original, value_text):
+    """
+    Set $this.Icon by replacing only the bytes of its <value> (or inserting a new
+    <data> element before </root>); every other byte of the file is kept as is.
+    Returns (data, action) like set_icon_in_tree, or None when the file is not a
+    plain UTF-8 resx this can edit safely (the caller then falls back to ElementTree).
+    """
+    if original.startswith((b'\xff\xfe', b'\xfe\xff')) or b'\x00' in original[:256]:
+        return None
+    root_end = original.rfind(b'</root>')
+    if root_end < 0:
+        return None
+    newline = b'\r\n' if b'\r\n' in original else b'\n'
+    value = value_text.encode('utf-8').replace(b'\n', newline)
 
-    def _get_encoded_icon(self):
-        if not os.path.exists(self.icon_path):
-            print(f"Error: Icon file '{self.icon_path}' not found.")
+    pieces = []
+    position = 0
+    found = False
+    changed = False
+    for start in ICON_DATA_START_PATTERN.finditer(original, 0, root_end):
+        if start.group().startswith(b'<!--'):
+            continue
+        if start.group().endswith(b'/>'):
             return None
+        end = original.find(b'</data>', start.end())
+        if end < 0:
+            return None
+        current = VALUE_PATTERN.search(original, start.end(), end)
+        if current is None:
+            return None
+        found = True
+        # Files written by the ElementTree path have LF inside the value; same icon, no rewrite
+        if original[current.start(1):current.end(1)].replace(b'\r\n', b'\n') == value.replace(b'\r\n', b'\n'):
+            continue
+        pieces.append(original[position:current.start(1)])
+        pieces.append(value)
+        position = current.end(1)
+        changed = True
+
+    if found:
+        if not changed:
+            return original, "unchanged"
+        pieces.append(original[position:])
+        return b''.join(pieces), "updated"
+
+    # Insert at the start of the </root> line, indented like the designer does
+    insert_at = original.rfind(b'\n', 0, root_end) + 1
+    if original[insert_at:root_end].strip():
+        insert_at = root_end
+    element = (b'  <data name="$this.Icon" ' + ICON_DATA_ATTRIBUTES + b'>' + newline
+               + b'    <value>' + value + b'</value>' + newline
+               + b'  </data>' + newline)
+    return original[:insert_at] + element + original[insert_at:], "added"
 
-        with open(self.icon_path, 'rb') as f:
-            iconbytes = f.read()
+
+class IconPayload:
+    """An icon encoded once: its base64 text and the chunked, indented <value> text for resx files"""
+    def __init__(self, icon_path, iconbytes):
+        self.icon_path = icon_path
         # Decode bytes to string for XML compatibility
-        return base64.b64encode(iconbytes).decode('utf-8')
+        self.encoded_icon = base64.b64encode(iconbytes).decode('utf-8')
+        # Chunk the base64 string into lines of 80 characters for better readability
+        chunked_str = VALUE_LINE_PREFIX.join(self.encoded_icon[i:i+VALUE_CHUNK_SIZE] for i in range(0, len(self.encoded_icon), VALUE_CHUNK_SIZE))
+        self.value_text = VALUE_LINE_PREFIX + chunked_str + VALUE_END
+
+
+_icon_payloads = {}
+_icon_payloads_lock = threading.Lock()
+
+def get_icon_payload(icon_path):
+    """
+    The payload of icon_path, encoded once per process and re-encoded only when the
+    file changes (keyed by path, mtime and size). Returns None if the icon is missing.
+    """
+    try:
+        stat = os.stat(icon_path)
+    except OSError:
+        print(f"Error: Icon file '{icon_path}' not found.")
+        return None
+    key = (normalize_path(icon_path), stat.st_mtime_ns, stat.st_size)
+    with _icon_payloads_lock:
+        payload = _icon_payloads.get(key)
+    if payload is None:
+        with open(icon_path, 'rb') as f:
+            payload = IconPayload(icon_path, f.read())
+        with _icon_payloads_lock:
+            _icon_payloads[key] = payload
+    return payload
+
+
+class IconRegistry:
+    """
+    Which .ico each project gets: the icon registered for the closest folder above the
+    project, else the default icon. Lets different product folders carry different icons.
+    """
+    def __init__(self, default_icon, folder_icons = None):
+        self.default_icon = default_icon
+        self.folder_icons = {}
+        for folder, icon_path in (folder_icons or {}).items():
+            self.register(folder, icon_path)
+
+    def register(self, folder, icon_path):
+        self.folder_icons[normalize_path(folder)] = icon_path
+
+    @classmethod
+    def from_file(cls, mapping_path, default_icon):
+        """Read a JSON object mapping folders to .ico files; relative paths are relative to the mapping file"""
+        base_dir = os.path.dirname(os.path.abspath(mapping_path))
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        return cls(default_icon, {os.path.join(base_dir, folder): os.path.join(base_dir, icon_path)
+                                  for folder, icon_path in mapping.items()})
+
+    def icon_for(self, project_dir):
+        directory = normalize_path(project_dir)
+        while True:
+            if directory in self.folder_icons:
+                return self.folder_icons[directory]
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return self.default_icon
+            directory = parent
+
+
+class ResxIconUpdater:
+    def __init__(self, icon_path, plan = None):
+        self.icon_path = icon_path
+        # With a SourcePlan edits are recorded there instead of written
+        self.plan = plan
+        self.payload = get_icon_payload(icon_path)
+        self.encoded_icon = self.payload.encoded_icon if self.payload is not None else None
 
     def update_resx_file(self, file_path):
+        """Set $this.Icon in file_path. Returns True if the file was rewritten (or would be, with a plan), False if it already matched."""
         if not self.encoded_icon:
             raise Exception("Error: No encoded icon available. Cannot update.")
 
         print(f"Checking {file_path}...")
         # Parse the XML file safely using a context manager to ensure it's closed
-        with open(file_path, 'r', encoding='utf-8') as f:
-            tree = ET.parse(f)
-        root = tree.getroot()
-        chunk_size = 80
-
-        found = False
-        # Replace Icon
-        for item in root.iter('data'):
-            if item.attrib.get('name') == '$this.Icon':
-                found = True
-                # Chunk the base64 string into lines of 80 characters for better readability
-                chunked_str = '\n        '.join(self.encoded_icon[i:i+chunk_size] for i in range(0, len(self.encoded_icon), chunk_size))
-                item.find('value').text = '\n        ' + chunked_str + '\n    '
-
-        if found:
+        with open(file_path, 'rb') as f:
+            original = f.read()
+        result = splice_icon_value(original, self.payload.value_text)
+        if result is None:
+            print(f"  {file_path} can't be edited in place, rewriting it through ElementTree")
+            result = set_icon_in_tree(original, self.payload.value_text)
+        data, action = result
+
+        if action == "unchanged":
+            print(f"  $this.Icon in {file_path} is already up to date")
+            return False
+        if action == "updated":
             print(f"  $this.Icon found in {file_path}, updating...")
-            # Overwrite the file
-            with open(file_path, 'wb') as f:
-                f.write(ET.tostring(root, encoding='utf-8', xml_declaration=True))
         else:
             print(f"  $this.Icon not found in {file_path}, adding...")
-            # Add a new data element
-            new_data = ET.SubElement(root, 'data', name='$this.Icon')
-            new_data.set('type', 'System.Drawing.Icon, System.Drawing')
-            new_data.set('mimetype', 'application/x-microsoft.net.object.bytearray.base64')
-            new_value = ET.SubElement(new_data, 'value')
-            chunked_str = '\n        '.join(self.encoded_icon[i:i+chunk_size] for i in range(0, len(self.encoded_icon), chunk_size))
-            new_value.text = '\n        ' + chunked_str + '\n    '
-            root.append(new_data)
-            with open(file_path, 'wb') as f:
-                f.write(ET.tostring(root, encoding='utf-8', xml_declaration=True))
-
-
-    def search_and_update(self, project_dir, target_filenames = {'mainform.resx', 'form1.resx'}):
+        if self.plan is not None:
+            return self.plan.record(file_path, original, data, f"$this.Icon {action}")
+        # Overwrite the file
+        return write_if_changed(file_path, data, original)
+
+
+    def search_and_update(self, project_dir, target_filenames = {'mainform.resx', 'form1.resx'}, index = None):
+        """Update every resx named in target_filenames; returns the paths that were rewritten"""
         print(f"Searching in: {os.path.abspath(project_dir)}")
 
-        found_any = False
-        for root, dirs, files in os.walk(project_dir):
-            for file in files:
-                if file in [os.path.basename(filename) for filename in target_filenames]:
-                    found_any = True
-                    full_path = os.path.join(root, file)
-                    self.update_resx_file(full_path)
+        if index is None:
+            index = WorkspaceIndex(project_dir)
+        project = index.project(project_dir)
+        matches = project.find_resx_files(target_filenames) if project is not None else []
+        changed = [full_path for full_path in matches if self.update_resx_file(full_path)]
 
-        if not found_any:
+        if not matches:
              raise Exception("{} not found in the project directory".format(target_filenames))
+        return changed
 
  
\ No newline at end of file
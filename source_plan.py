@@ -0,0 +1,112 @@
+import os
+import json
+import difflib
+import threading
+import logging
+from workspace_index import normalize_path
+
+logger = logging.getLogger("msBuildScript")
+
+# Written to the workspace root by --plan
+PLAN_PATCH_NAME = "source_plan.patch"
+PLAN_SUMMARY_NAME = "source_plan.json"
+
+
+def _split_lines(text):
+    """Lines ending in \n (any \r stays with its line), unlike str.splitlines which also splits on \f, \x1c, ..."""
+    lines = [line + "\n" for line in text.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    return lines if lines[-1] else lines[:-1]
+
+
+class SourcePlan:
+    """
+    Collects the edits a prepare run would make instead of writing them.
+    The updaters hand record() the exact bytes they would have written, so the
+    patch shows the real edit, line endings and BOM included.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        # normalized path -> (path, original bytes, new bytes, change description)
+        self.edits = {}
+        self._diffs = {}
+
+    def record(self, file_path, original, data, change):
+        """Record an edit of file_path; returns True when it changes the file, like write_if_changed"""
+        if original == data:
+            return False
+        with self._lock:
+            self.edits[normalize_path(file_path)] = (file_path, original, data, change)
+        return True
+
+    def relative_path(self, file_path):
+        return os.path.relpath(file_path, self.root).replace(os.sep, "/")
+
+    def file_diff(self, file_path):
+        """git-style unified diff of one recorded edit; binary when either side isn't UTF-8"""
+        key = normalize_path(file_path)
+        if key not in self._diffs:
+            _, original, data, _ = self.edits[key]
+            self._diffs[key] = self._make_diff(file_path, original, data)
+        return self._diffs[key]
+
+    def _make_diff(self, file_path, original, data):
+        path = self.relative_path(file_path)
+        header = [f"diff --git a/{path} b/{path}\n"]
+        try:
+            before = _split_lines(original.decode("utf-8"))
+            after = _split_lines(data.decode("utf-8"))
+        except UnicodeDecodeError:
+            return "".join(header) + f"Binary files a/{path} and b/{path} differ\n"
+        lines = []
+        for line in difflib.unified_diff(before, after, f"a/{path}", f"b/{path}"):
+            lines.append(line)
+            if not line.endswith("\n"):
+                lines.append("\n\\ No newline at end of file\n")
+        return "".join(header + lines)
+
+    def diff(self):
+        """One patch over every recorded edit, in path order"""
+        with self._lock:
+            edits = sorted(self.edits.values(), key=lambda edit: self.relative_path(edit[0]))
+        return "".join(self.file_diff(edit[0]) for edit in edits)
+
+    def summary(self, jobs, result_of):
+        """JSON-ready summary: per project its result (result_of(job) -> (result, details)) and edits"""
+        projects = []
+        for job in jobs:
+            result, details = result_of(job)
+            edits = []
+            for file_path in job.patched_files:
+                edit = self.edits.get(normalize_path(file_path))
+                if edit is None:
+                    continue
+                change = edit[3]
+                added = removed = 0
+                for line in self.file_diff(file_path).splitlines()[3:]:
+                    if line.startswith("+"):
+                        added += 1
+                    elif line.startswith("-"):
+                        removed += 1
+                edits.append({"file": self.relative_path(file_path), "change": change,
+                              "lines_added": added, "lines_removed": removed})
+            projects.append({"project": self.relative_path(os.path.join(job.project_dir, job.csproj)),
+                             "form": job.main_form_name, "result": result, "details": details, "edits": edits})
+        results = {}
+        for project in projects:
+            results[project["result"]] = results.get(project["result"], 0) + 1
+        return {"workspace": os.path.abspath(self.root), "files_changed": len(self.edits),
+                "results": results, "projects": projects}
+
+    def save(self, patch_path, summary_path, jobs, result_of):
+        """Write the patch and the JSON summary; returns the summary"""
+        summary = self.summary(jobs, result_of)
+        summary["patch"] = os.path.abspath(patch_path)
+        # newline="" keeps CRLF files' line endings in the patch, so it still applies
+        with open(patch_path, "w", encoding="utf-8", newline="") as f:
+            f.write(self.diff())
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        logger.debug(f"Wrote source plan {patch_path} and {summary_path}: {len(self.edits)} file(s) would change")
+        return summary
@@ -0,0 +1,23 @@
+"""Shared access to the designer file corpus in tests/designer_corpus"""
+import os
+import json
+from helpers import TESTS_DIR
+
+CORPUS_DIR = os.path.join(TESTS_DIR, "designer_corpus")
+
+
+def load_expected():
+    """file name -> {"form", "open_line", "close_line", "adds"}; the lines are 1-based and null when there is no method"""
+    with open(os.path.join(CORPUS_DIR, "expected.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_source(path, keep_crlf = False):
+    """A corpus file decoded like update_designer_file does (BOM dropped, universal newlines)"""
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8-sig")
+    return text if keep_crlf else text.replace("\r\n", "\n")
+
+
+def line_of(source, index):
+    return source.count("\n", 0, index) + 1
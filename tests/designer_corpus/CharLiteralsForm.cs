@@ -0,0 +1,32 @@
+using System.Windows.Forms;
+
+namespace SampleApp
+{
+    public partial class CharLiteralsForm : Form
+    {
+        /*
+        private void InitializeComponent()
+        {
+            // old layout, kept for reference }
+        }
+        */
+
+        // private void InitializeComponent() { this.Text = "old"; }
+
+        private void InitializeComponent()
+        {
+            char open = '{';
+            char close = '}';
+            char quote = '\'';
+            char doubleQuote = '"';
+            char backslash = '\\';
+            this.Text = open + "Chars" + close; /* } */ // }
+            this.Name = "CharLiteralsForm";
+        }
+
+        private void Other()
+        {
+            this.Icon = null;
+        }
+    }
+}
@@ -0,0 +1,32 @@
+namespace SampleApp
+{
+    partial class ConditionalForm
+    {
+        private System.ComponentModel.IContainer components = null;
+
+        #region Windows Form Designer generated code {layout v2}
+
+        private void InitializeComponent()
+        {
+            this.grid = new System.Windows.Forms.DataGridView();
+#if DEBUG
+            if (System.Diagnostics.Debugger.IsAttached)
+            {
+                this.grid.Tag = "debug";
+            }
+#elif TRACE
+            this.grid.Tag = new { Mode = "trace" };
+#else
+            this.grid.Tag = null;
+#endif
+            #region Grid columns {generated}
+            this.grid.Columns.Add("Name", "Name");
+            #endregion
+            this.Controls.Add(this.grid);
+            this.Name = "ConditionalForm";
+        }
+        #endregion
+
+        private System.Windows.Forms.DataGridView grid;
+    }
+}
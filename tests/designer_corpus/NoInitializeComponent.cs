@@ -0,0 +1,13 @@
+using System.Windows.Forms;
+
+namespace SampleApp
+{
+    public partial class NoInitializeComponent : Form
+    {
+        public NoInitializeComponent()
+        {
+            InitializeComponent();
+            this.Text = "void InitializeComponent() { }";
+        }
+    }
+}
@@ -0,0 +1,38 @@
+using System;
+using System.Drawing;
+using System.Windows.Forms;
+
+namespace SampleApp
+{
+    // Hand-written form: no designer file and no #region around InitializeComponent
+    public class SingleFileForm : Form
+    {
+        private Button okButton;
+
+        public SingleFileForm()
+        {
+            InitializeComponent();
+        }
+
+        private void InitializeComponent()
+        {
+            this.okButton = new Button();
+            this.okButton.Text = "OK";
+            this.okButton.Click += (sender, e) => { this.Close(); };
+            this.Controls.Add(this.okButton);
+            this.Text = "Single file form";
+        }
+
+        private void UseCustomIcon(System.ComponentModel.ComponentResourceManager resources)
+        {
+            if (resources != null)
+            {
+                this.Icon = ((System.Drawing.Icon)(resources.GetObject("$this.Icon")));
+            }
+        }
+
+        #region Helpers
+        private static string Describe(Control control) { return control.Name + " {" + control.Text + "}"; }
+        #endregion
+    }
+}
@@ -0,0 +1,30 @@
+namespace SampleApp
+{
+    partial class StringLiteralsForm
+    {
+        private string template = "private void InitializeComponent() {";
+
+        #region Windows Form Designer generated code
+
+        private void InitializeComponent()
+        {
+            this.label1 = new System.Windows.Forms.Label();
+            this.label1.Text = "Close the form with } or press \"Esc\" {";
+            this.label2.Text = @"C:\Samples\{Barcode}\";
+            this.label3.Text = @"He said ""}"" and left";
+            this.label4.Text = $"Count: {this.items.Count} {{not a hole}} }}";
+            this.label5.Text = $"{(this.items.Count > 0 ? "}" : "{")}";
+            this.label6.Text = $@"C:\Users\{System.Environment.UserName}\{{cache}}";
+            this.label7.Text = """
+                { "raw": "json with } and {" }
+                """;
+            this.label8.Text = $$"""{"name": "{{this.Name}}", "brace": "}"}""";
+            this.label9.Text = "";
+            this.label10.Text = @"";
+        }
+
+        #endregion
+
+        private System.Windows.Forms.Label label1;
+    }
+}
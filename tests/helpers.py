@@ -0,0 +1,20 @@
+"""Shared test setup: the repository on sys.path and a virtual clock for timed waits"""
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+class VirtualClock:
+    """Time that only moves when someone sleeps, so waits cost nothing to test or benchmark"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
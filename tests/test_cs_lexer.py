@@ -0,0 +1,69 @@
+import os
+import unittest
+import helpers  # noqa: F401  (puts the repository on sys.path)
+from corpus import CORPUS_DIR, load_expected, read_source, line_of
+from cs_lexer import find_method_body
+
+
+class FindMethodBodyCorpusTest(unittest.TestCase):
+    def test_corpus_spans(self):
+        for name, expected in load_expected().items():
+            for keep_crlf in (False, True):
+                with self.subTest(name, crlf=keep_crlf):
+                    source = read_source(os.path.join(CORPUS_DIR, name), keep_crlf)
+                    span = find_method_body(source)
+                    if expected["open_line"] is None:
+                        self.assertIsNone(span)
+                        continue
+                    self.assertIsNotNone(span)
+                    start, end = span
+                    self.assertEqual(source[start - 1], "{")
+                    self.assertEqual(source[end], "}")
+                    self.assertEqual(line_of(source, start - 1), expected["open_line"])
+                    self.assertEqual(line_of(source, end), expected["close_line"])
+
+    def test_single_file_form_body_stops_at_its_own_brace(self):
+        # The old greedy regex ran on to the last "} #endregion" and saw UseCustomIcon's this.Icon line
+        source = read_source(os.path.join(CORPUS_DIR, "SingleFileForm.cs"))
+        start, end = find_method_body(source)
+        self.assertNotIn("UseCustomIcon", source[start:end])
+        self.assertNotIn("$this.Icon", source[start:end])
+
+
+class FindMethodBodyTest(unittest.TestCase):
+    def body(self, source, method_name = "InitializeComponent"):
+        span = find_method_body(source, method_name)
+        return None if span is None else source[span[0]:span[1]]
+
+    def test_without_endregion(self):
+        self.assertEqual(self.body("class A { void InitializeComponent() { a(); } void B() { } }"), " a(); ")
+
+    def test_unbalanced_braces(self):
+        self.assertIsNone(self.body("class A { void InitializeComponent() { if (a) { b(); }"))
+
+    def test_declaration_in_comment_or_string(self):
+        self.assertIsNone(self.body("// void InitializeComponent() {\nclass A { }"))
+        self.assertIsNone(self.body('class A { string s = "void InitializeComponent() {"; }'))
+        self.assertEqual(self.body("class A {\n// void InitializeComponent()\n{ }\n void InitializeComponent() { z; } }"), " z; ")
+
+    def test_interpolation_holes_with_nested_strings(self):
+        body = ' t = $"{(c ? "}" : d)} {{"; u = $@"{x}""}"; '
+        self.assertEqual(self.body("class A { void InitializeComponent() {" + body + "} }"), body)
+
+    def test_raw_strings(self):
+        body = ' a = """\n  }{ "" \n  """; b = $$"""{{x}} } """; c = @""""; '
+        self.assertEqual(self.body("class A { void InitializeComponent() {" + body + "} }"), body)
+
+    def test_char_literals(self):
+        body = " a = '{'; b = '\\''; c = '\"'; d = '}'; "
+        self.assertEqual(self.body("class A { void InitializeComponent() {" + body + "} }"), body)
+
+    def test_other_method_name(self):
+        self.assertEqual(self.body("class A { void InitializeComponent() { a; } void Setup() { b; } }", "Setup"), " b; ")
+
+    def test_method_name_is_not_a_prefix_match(self):
+        self.assertIsNone(self.body("class A { void InitializeComponentCore() { a; } }"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+from helpers import VirtualClock
+from frame_readiness import wait_until_stable
+
+
+class WaitUntilStableTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.blank = np.full((60, 80, 3), 240, dtype=np.uint8)
+        self.painted = self.blank.copy()
+        self.painted[10:20, 10:40] = 0
+
+    def wait(self, grab, **kwargs):
+        return wait_until_stable(grab, sleep=self.clock.sleep, clock=self.clock, **kwargs)
+
+    def test_blank_window_is_not_ready_until_it_paints(self):
+        stable, waited, _ = self.wait(lambda: self.blank if self.clock.now < 1.0 else self.painted)
+        self.assertTrue(stable)
+        self.assertGreaterEqual(waited, 1.0)
+
+    def test_window_that_stays_blank_times_out(self):
+        stable, waited, _ = self.wait(lambda: self.blank, max_wait=3)
+        self.assertFalse(stable)
+        self.assertGreaterEqual(waited, 3)
+
+    def test_painted_window_is_ready_after_stable_frames(self):
+        stable, _, frames = self.wait(lambda: self.painted)
+        self.assertTrue(stable)
+        self.assertEqual(frames, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import time
+import unittest
+import tempfile
+import helpers  # noqa: F401  (puts the repository on sys.path)
+
+try:
+    import process_supervisor
+    from process_supervisor import ProcessSupervisor
+except ImportError:
+    ProcessSupervisor = None
+
+
+@unittest.skipIf(ProcessSupervisor is None or os.name != "posix", "needs psutil and a POSIX shell")
+class ProcessSupervisorTest(unittest.TestCase):
+    def setUp(self):
+        self.supervisor = ProcessSupervisor()
+        self.addCleanup(self.supervisor.shutdown)
+        self.cwd = tempfile.gettempdir()
+
+    def run_shell(self, script, on_line = None):
+        lines = []
+        def on_output(stream_name, line):
+            if on_line is not None:
+                on_line(line)
+            lines.append(line)
+        started = time.monotonic()
+        returncode = self.supervisor.run(["sh", "-c", script], self.cwd, "test", on_output=on_output)
+        return returncode, lines, time.monotonic() - started
+
+    def test_output_is_collected(self):
+        returncode, lines, _ = self.run_shell("echo one; echo two >&2; exit 3")
+        self.assertEqual(returncode, 3)
+        self.assertEqual(sorted(lines), ["one", "two"])
+
+    def test_grandchild_holding_the_pipes_does_not_stall_the_step(self):
+        returncode, lines, elapsed = self.run_shell("echo hi; (sleep 3; echo late) & echo bye")
+        self.assertEqual(returncode, 0)
+        self.assertEqual(lines, ["hi", "bye"])
+        self.assertLess(elapsed, 1.5)
+
+    def test_slow_caller_holds_the_child_back_without_losing_lines(self):
+        original_size = process_supervisor.LINE_QUEUE_SIZE
+        process_supervisor.LINE_QUEUE_SIZE = 10
+        self.addCleanup(setattr, process_supervisor, "LINE_QUEUE_SIZE", original_size)
+        # The caller stalls past DRAIN_SETTLE_SECONDS while the child is long gone
+        on_line = lambda line: time.sleep(0.5) if line == "1" else None
+        returncode, lines, _ = self.run_shell("seq 1 1000", on_line)
+        self.assertEqual(returncode, 0)
+        self.assertEqual(lines, [str(i) for i in range(1, 1001)])
+
+    def test_error_in_the_caller_is_raised_after_the_step(self):
+        def on_line(line):
+            raise ValueError(line)
+        with self.assertRaisesRegex(ValueError, "^1$"):
+            self.run_shell("seq 1 50000", on_line)
+        self.assertEqual(self.supervisor.run(["true"], self.cwd), 0)
+
+    def test_started_children_are_released_once_they_exit(self):
+        finished = [self.supervisor.start(["sh", "-c", "echo done"], self.cwd) for _ in range(3)]
+        running = self.supervisor.start(["sleep", "30"], self.cwd)
+        deadline = time.monotonic() + 5
+        while not all(child.exited() for child in finished) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(2 * process_supervisor.EXIT_POLL_SECONDS)
+        self.assertEqual(list(self.supervisor._children), [running.pid])
+        # Only the tree that is still running is stopped
+        self.assertEqual(self.supervisor.shutdown(grace_seconds=1), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
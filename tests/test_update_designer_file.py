@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+import helpers  # noqa: F401  (puts the repository on sys.path)
+from corpus import CORPUS_DIR, load_expected, read_source
+from cs_lexer import find_method_body
+from workspace_index import WorkspaceIndex
+
+try:
+    import msBuildScript
+except ImportError:
+    # cv2, pyautogui, numpy, ... are only installed on the capture machines
+    msBuildScript = None
+
+CSPROJ = '<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup><OutputType>WinExe</OutputType></PropertyGroup></Project>'
+ADDED_LINES = {
+    "resource manager": "System.ComponentModel.ComponentResourceManager resources = new System.ComponentModel.ComponentResourceManager(typeof({form}));",
+    "Icon": 'Icon = (System.Drawing.Icon)resources.GetObject("$this.Icon");',
+}
+
+
+@unittest.skipIf(msBuildScript is None, "msBuildScript's GUI dependencies are not installed")
+class UpdateDesignerFileCorpusTest(unittest.TestCase):
+    def project_with(self, name):
+        """A temporary project directory holding a copy of one corpus file; returns (directory, index)"""
+        project_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, project_dir)
+        shutil.copy(os.path.join(CORPUS_DIR, name), project_dir)
+        with open(os.path.join(project_dir, "Sample.csproj"), "w", encoding="utf-8") as f:
+            f.write(CSPROJ)
+        return project_dir, WorkspaceIndex(project_dir)
+
+    def test_corpus(self):
+        for name, expected in load_expected().items():
+            with self.subTest(name):
+                project_dir, index = self.project_with(name)
+                path = os.path.join(project_dir, name)
+                if expected["open_line"] is None:
+                    with self.assertRaises(Exception):
+                        msBuildScript.update_designer_file(project_dir, expected["form"], file=name, index=index)
+                    continue
+
+                before = read_source(path)
+                with open(path, "rb") as f:
+                    original_bytes = f.read()
+                modified = msBuildScript.update_designer_file(project_dir, expected["form"], file=name, index=index)
+                self.assertEqual(modified, bool(expected["adds"]))
+                if not modified:
+                    with open(path, "rb") as f:
+                        self.assertEqual(f.read(), original_bytes)
+
+                after = read_source(path)
+                before_start, before_end = find_method_body(before)
+                start, end = find_method_body(after)
+                # Only the InitializeComponent body changes
+                self.assertEqual(after[:start], before[:before_start])
+                self.assertEqual(after[end:], before[before_end:])
+                body = after[start:end]
+                for added in expected["adds"]:
+                    self.assertEqual(body.count(ADDED_LINES[added].format(form=expected["form"])), 1, added)
+
+                # A second run finds everything in place
+                self.assertFalse(msBuildScript.update_designer_file(project_dir, expected["form"], file=name, index=index))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from helpers import VirtualClock
+from window_backend import FakeWindowBackend, wait_for_new_window
+
+
+class WaitForNewWindowTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.backend = FakeWindowBackend(self.clock)
+
+    def wait(self, owner_pids = None, existing = (), timeout = 10):
+        return wait_for_new_window(self.backend, set(existing), owner_pids, timeout=timeout,
+                                   sleep=self.clock.sleep, clock=self.clock)
+
+    def test_only_windows_of_the_process_tree_are_accepted(self):
+        self.backend.open_window("Notification", pid=1, delay=0.5)
+        self.backend.open_window("Sample Form", pid=101, delay=1.0)
+        # The form belongs to a child of the launched process
+        window, polls = self.wait(lambda: {100, 101})
+        self.assertEqual(window.title, "Sample Form")
+        self.assertGreaterEqual(self.clock.now, 1.0)
+        self.assertEqual(polls, self.backend.enumerations)
+
+    def test_title_only_matching_without_owner_pids(self):
+        self.backend.open_window("Notification", pid=1, delay=0.5)
+        self.backend.open_window("Sample Form", pid=100, delay=1.0)
+        window, _ = self.wait()
+        self.assertEqual(window.title, "Notification")
+
+    def test_existing_and_system_windows_are_skipped(self):
+        before = self.backend.open_window("Already open", pid=100)
+        self.backend.open_window("Default IME", pid=100, delay=0.1)
+        self.backend.open_window("", pid=100, delay=0.1)
+        self.backend.open_window("Sample Form", pid=100, delay=0.3)
+        window, _ = self.wait(lambda: {100}, existing=self.backend.snapshot())
+        self.assertIsNot(window, before)
+        self.assertEqual(window.title, "Sample Form")
+
+    def test_stops_early_when_the_process_tree_exits(self):
+        self.backend.open_window("Notification", pid=1, delay=0.5)
+        with self.assertRaisesRegex(Exception, "exited before showing a window"):
+            self.wait(lambda: {100} if self.clock.now < 2.0 else set(), timeout=60)
+        self.assertLess(self.clock.now, 2.5)
+
+    def test_times_out(self):
+        self.backend.open_window("Sample Form", pid=100, delay=30)
+        with self.assertRaisesRegex(Exception, "No application window appeared within 5s"):
+            self.wait(lambda: {100}, timeout=5)
+        # The last sleep is cut to the deadline
+        self.assertAlmostEqual(self.clock.now, 5.0)
+
+    def test_polls_back_off(self):
+        self.backend.open_window("Sample Form", pid=100, delay=3.0)
+        _, polls = self.wait(lambda: {100})
+        # A fixed 0.05s poll would have needed 61 enumerations
+        self.assertLess(polls, 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
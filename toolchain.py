@@ -0,0 +1,73 @@
+import os
+import shutil
+import subprocess
+import threading
+import logging
+
+logger = logging.getLogger("msBuildScript")
+
+VSWHERE_PATH = os.path.join(os.environ.get("ProgramFiles(x86)", r"C:\Program Files (x86)"),
+                            "Microsoft Visual Studio", "Installer", "vswhere.exe")
+
+
+class Toolchain:
+    """Absolute paths and versions of the dotnet CLI and MSBuild used for every build step"""
+    def __init__(self, dotnet, dotnet_version, msbuild, msbuild_version):
+        self.dotnet = dotnet
+        self.dotnet_version = dotnet_version
+        self.msbuild = msbuild
+        self.msbuild_version = msbuild_version
+
+    def describe(self):
+        return (f"dotnet {self.dotnet_version} ({self.dotnet}), "
+                f"MSBuild {self.msbuild_version} ({self.msbuild})")
+
+
+def _tool_version(args):
+    result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
+    if result.returncode != 0:
+        raise Exception(f"{args[0]} exited with return code {result.returncode}: {result.stderr.decode(errors='replace').strip()}")
+    lines = [line.strip() for line in result.stdout.decode(errors="replace").splitlines() if line.strip()]
+    # msbuild -version prints a banner first unless -nologo works; the version is the last line
+    return lines[-1] if lines else "unknown"
+
+
+def _find_msbuild():
+    msbuild = shutil.which("msbuild")
+    if msbuild is None and os.path.exists(VSWHERE_PATH):
+        # Outside a Developer Command Prompt msbuild is not on PATH; ask the VS installer
+        result = subprocess.run([VSWHERE_PATH, "-latest", "-prerelease", "-products", "*",
+                                 "-requires", "Microsoft.Component.MSBuild",
+                                 "-find", r"MSBuild\**\Bin\MSBuild.exe"],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
+        candidates = [line.strip() for line in result.stdout.decode(errors="replace").splitlines() if line.strip()]
+        if candidates:
+            msbuild = candidates[0]
+    return msbuild
+
+
+def resolve_toolchain():
+    """Locate and version-check dotnet and msbuild; raises if either is missing or broken"""
+    dotnet = shutil.which("dotnet")
+    if dotnet is None:
+        raise Exception("dotnet was not found on PATH")
+    msbuild = _find_msbuild()
+    if msbuild is None:
+        raise Exception("msbuild was not found on PATH or through vswhere")
+    return Toolchain(
+        os.path.abspath(dotnet), _tool_version([dotnet, "--version"]),
+        os.path.abspath(msbuild), _tool_version([msbuild, "-version", "-nologo"]),
+    )
+
+
+_toolchain = None
+_toolchain_lock = threading.Lock()
+
+def get_toolchain():
+    """The toolchain resolved once per run"""
+    global _toolchain
+    with _toolchain_lock:
+        if _toolchain is None:
+            _toolchain = resolve_toolchain()
+            logger.info(f"Using {_toolchain.describe()}")
+        return _toolchain
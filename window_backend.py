@@ -0,0 +1,169 @@
+import os
+import time
+import logging
+
+logger = logging.getLogger("msBuildScript")
+
+# Helper windows every WinForms process creates; never the application's main window
+SYSTEM_WINDOW_TITLES = ['OleMainThreadWndName', 'MSCTFIME UI', 'Default IME', 'ConsoleWindowClass']
+
+WINDOW_DETECT_TIMEOUT = 60
+WINDOW_POLL_INITIAL = 0.05
+# Below the old fixed 0.2s poll: detection latency costs wall-clock time per project,
+# an extra enumeration only a cheap desktop call
+WINDOW_POLL_MAX = 0.15
+WINDOW_POLL_BACKOFF = 1.5
+
+
+class WindowInfo:
+    """A top-level window: a stable handle, its title, owning PID (None if unknown) and the backend's window object"""
+    def __init__(self, handle, title, pid, window):
+        self.handle = handle
+        self.title = title
+        self.pid = pid
+        self.window = window
+
+
+class WindowBackend:
+    """Enumerates top-level windows; supports_pids tells whether WindowInfo.pid is filled in"""
+    supports_pids = False
+
+    def windows(self):
+        raise NotImplementedError
+
+    def handle_of(self, window):
+        raise NotImplementedError
+
+    def snapshot(self):
+        """Handles of the windows open right now"""
+        return {info.handle for info in self.windows()}
+
+    def is_open(self, window):
+        return self.handle_of(window) in self.snapshot()
+
+
+class PygetwindowBackend(WindowBackend):
+    """The desktop's windows through pygetwindow; on Windows the owning PID comes from the HWND"""
+    def __init__(self):
+        import pygetwindow
+        self._gw = pygetwindow
+        self._user32 = None
+        if os.name == "nt":
+            import ctypes
+            self._ctypes = ctypes
+            self._user32 = ctypes.WinDLL("user32")
+            self.supports_pids = True
+
+    def _pid(self, window):
+        handle = getattr(window, "_hWnd", None)
+        if self._user32 is None or handle is None:
+            return None
+        pid = self._ctypes.c_ulong()
+        self._user32.GetWindowThreadProcessId(handle, self._ctypes.byref(pid))
+        return pid.value
+
+    def handle_of(self, window):
+        return getattr(window, "_hWnd", window.title)
+
+    def windows(self):
+        return [WindowInfo(self.handle_of(window), window.title, self._pid(window), window)
+                for window in self._gw.getAllWindows()]
+
+
+class FakeWindow:
+    """In-memory stand-in for a pygetwindow window"""
+    def __init__(self, title, pid, left = 0, top = 0, width = 800, height = 600):
+        self.title = title
+        self.pid = pid
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.isActive = False
+        self.isMaximized = False
+        self.closed = False
+
+    def activate(self):
+        self.isActive = True
+
+    def maximize(self):
+        self.isMaximized = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeWindowBackend(WindowBackend):
+    """
+    Windows that appear after a scripted delay, so detection can be exercised and
+    benchmarked without a desktop.
+    """
+    supports_pids = True
+
+    def __init__(self, clock = time.monotonic):
+        self._clock = clock
+        self._windows = []
+        self.enumerations = 0
+
+    def open_window(self, title, pid, delay = 0, **geometry):
+        window = FakeWindow(title, pid, **geometry)
+        self._windows.append((self._clock() + delay, window))
+        return window
+
+    def handle_of(self, window):
+        return id(window)
+
+    def windows(self):
+        self.enumerations += 1
+        now = self._clock()
+        return [WindowInfo(id(window), window.title, window.pid, window)
+                for appears_at, window in self._windows if appears_at <= now and not window.closed]
+
+
+def is_candidate(info):
+    return bool(info.title.strip()) and not any(word in info.title for word in SYSTEM_WINDOW_TITLES)
+
+
+def wait_for_new_window(backend, existing, owner_pids = None, timeout = WINDOW_DETECT_TIMEOUT,
+                        poll_initial = WINDOW_POLL_INITIAL, poll_max = WINDOW_POLL_MAX,
+                        sleep = time.sleep, clock = time.monotonic):
+    """
+    Poll until a window that was not in `existing` (a snapshot of handles) appears and
+    return (window, number of enumerations). When the backend knows window owners and
+    owner_pids() is given, only windows of those processes (the launched process tree)
+    are accepted, and detection stops early once that tree is gone; otherwise the first
+    new titled window wins. The poll interval backs off from poll_initial to poll_max,
+    so fast-starting forms are found quickly without enumerating the desktop every
+    few milliseconds for slow ones. Raises once timeout seconds have passed.
+    """
+    deadline = clock() + timeout
+    delay = poll_initial
+    polls = 0
+    match_pids = owner_pids is not None and backend.supports_pids
+    while True:
+        polls += 1
+        candidates = [info for info in backend.windows() if info.handle not in existing and is_candidate(info)]
+        if match_pids:
+            pids = owner_pids()
+            if not pids:
+                raise Exception("Application exited before showing a window")
+            candidates = [info for info in candidates if info.pid in pids]
+        if candidates:
+            logger.debug(f"Selected window '{candidates[0].title}' (PID {candidates[0].pid}) after {polls} poll(s)")
+            return candidates[0].window, polls
+
+        remaining = deadline - clock()
+        if remaining <= 0:
+            raise Exception(f"No application window appeared within {timeout}s ({polls} poll(s))")
+        sleep(min(delay, remaining))
+        delay = min(delay * WINDOW_POLL_BACKOFF, poll_max)
+
+
+_backend = None
+
+def get_window_backend():
+    """The desktop window backend, created on first use"""
+    global _backend
+    if _backend is None:
+        _backend = PygetwindowBackend()
+    return _backend
@@ -0,0 +1,99 @@
+import os
+import uuid
+import logging
+from workspace_index import normalize_path
+
+logger = logging.getLogger("msBuildScript")
+
+CSHARP_PROJECT_TYPE = "{FAE04EC0-301F-11D3-BF4B-00C04F79EFBC}"
+CSHARP_SDK_PROJECT_TYPE = "{9A19103F-16F7-4668-BE54-9A1E7A4F7556}"
+SOLUTION_FOLDER_TYPE = "{2150E333-8FDC-42A3-9474-1A3956D46DE8}"
+
+
+def _guid(name):
+    # Stable per path so regenerated solutions don't churn
+    return "{" + str(uuid.uuid5(uuid.NAMESPACE_URL, name)).upper() + "}"
+
+
+def _solution_platform(platform):
+    # Solutions spell the project platform AnyCPU with a space
+    return "Any CPU" if platform.lower() == "anycpu" else platform
+
+
+def write_solution(solution_path, projects):
+    """
+    Write a .sln referencing every CsprojInfo in projects.
+    Projects sharing a name are nested in their own solution folders, since
+    MSBuild rejects two top-level projects with the same name (MSB5004).
+    The solution's Debug|Any CPU builds every project in its own configuration
+    and default platform, the same output the per-project builds produce.
+    """
+    solution_dir = os.path.dirname(os.path.abspath(solution_path))
+    name_counts = {}
+    for info in projects:
+        name = os.path.splitext(os.path.basename(info.path))[0]
+        name_counts[name] = name_counts.get(name, 0) + 1
+
+    lines = [
+        "",
+        "Microsoft Visual Studio Solution File, Format Version 12.00",
+        "# Visual Studio Version 17",
+        "VisualStudioVersion = 17.0.31903.59",
+        "MinimumVisualStudioVersion = 10.0.40219.1",
+    ]
+    project_configurations = []
+    nested = []
+    for i, info in enumerate(projects, 1):
+        name = os.path.splitext(os.path.basename(info.path))[0]
+        relative_path = os.path.relpath(info.path, solution_dir).replace("/", "\\")
+        project_guid = _guid(normalize_path(info.path))
+        project_type = CSHARP_SDK_PROJECT_TYPE if info.sdk_style else CSHARP_PROJECT_TYPE
+        lines.append(f'Project("{project_type}") = "{name}", "{relative_path}", "{project_guid}"')
+        lines.append("EndProject")
+        project_configurations.append((project_guid, f"{info.configuration}|{_solution_platform(info.platform)}"))
+        if name_counts[name] > 1:
+            folder_name = f"{name}.{i}"
+            folder_guid = _guid(normalize_path(info.path) + "|folder")
+            lines.append(f'Project("{SOLUTION_FOLDER_TYPE}") = "{folder_name}", "{folder_name}", "{folder_guid}"')
+            lines.append("EndProject")
+            nested.append((project_guid, folder_guid))
+
+    lines.append("Global")
+    lines.append("\tGlobalSection(SolutionConfigurationPlatforms) = preSolution")
+    lines.append("\t\tDebug|Any CPU = Debug|Any CPU")
+    lines.append("\tEndGlobalSection")
+    lines.append("\tGlobalSection(ProjectConfigurationPlatforms) = postSolution")
+    for project_guid, configuration in project_configurations:
+        lines.append(f"\t\t{project_guid}.Debug|Any CPU.ActiveCfg = {configuration}")
+        lines.append(f"\t\t{project_guid}.Debug|Any CPU.Build.0 = {configuration}")
+    lines.append("\tEndGlobalSection")
+    if nested:
+        lines.append("\tGlobalSection(NestedProjects) = preSolution")
+        for project_guid, folder_guid in nested:
+            lines.append(f"\t\t{project_guid} = {folder_guid}")
+        lines.append("\tEndGlobalSection")
+    lines.append("EndGlobal")
+    lines.append("")
+
+    with open(solution_path, "w", encoding="utf-8-sig", newline="\r\n") as f:
+        f.write("\n".join(lines))
+    return solution_path
+
+
+def collect_package_references(projects):
+    """Unique (package id, version) pairs referenced by the projects"""
+    packages = {}
+    for info in projects:
+        for package_id, version in info.package_references:
+            packages.setdefault((package_id.lower(), version), (package_id, version))
+    return sorted(packages.values(), key=lambda package: (package[0].lower(), package[1]))
+
+
+def restore_is_current(info):
+    """True when the project has nothing to restore or was restored after its last edit"""
+    if not info.needs_restore:
+        return True
+    try:
+        return os.stat(info.assets_file).st_mtime_ns >= os.stat(info.path).st_mtime_ns
+    except OSError:
+        return False
@@ -0,0 +1,115 @@
+import os
+import logging
+
+logger = logging.getLogger("msBuildScript")
+
+# Directories that never contain project sources we care about
+PRUNED_DIRS = {"bin", "obj", ".git", ".vs", "packages"}
+
+
+def normalize_path(path):
+    """Normalize a path so it can be used as a dictionary key on any platform"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+class ProjectFiles:
+    """
+    Files recorded for a single project directory.
+    Holds the .csproj names found directly in the directory and every
+    .cs, .Designer.cs and .resx file below it (excluding pruned directories).
+    """
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        self.csproj_files = []
+        self.cs_files = []
+        self.designer_files = []
+        self.resx_files = []
+        self._paths = set()
+
+    def add_file(self, path, name):
+        lower_name = name.lower()
+        if lower_name.endswith(".cs"):
+            self.cs_files.append(path)
+            if lower_name.endswith(".designer.cs"):
+                self.designer_files.append(path)
+        elif lower_name.endswith(".resx"):
+            self.resx_files.append(path)
+        else:
+            return
+        self._paths.add(normalize_path(path))
+
+    def has_file(self, path):
+        return normalize_path(path) in self._paths
+
+    def top_level_cs_files(self):
+        """.cs files located directly in the project directory"""
+        project_dir = normalize_path(self.project_dir)
+        return [path for path in self.cs_files if normalize_path(os.path.dirname(path)) == project_dir]
+
+    def find_resx_files(self, target_filenames):
+        """Return every indexed .resx file whose name is one of target_filenames"""
+        names = {os.path.basename(filename) for filename in target_filenames}
+        return [path for path in self.resx_files if os.path.basename(path) in names]
+
+
+class WorkspaceIndex:
+    """
+    Index of every C# project below a root directory, built in a single os.scandir pass.
+    Files are attributed to every project directory that contains them, which matches
+    the recursive os.walk the discovery functions used to do per project.
+    An optional AnalysisCache travels with the index so lookups can reuse parsed facts.
+    """
+    def __init__(self, root, analysis_cache = None):
+        self.root = os.path.abspath(root)
+        self.analysis_cache = analysis_cache
+        self.projects = {}
+        self._scan()
+
+    def _scan(self):
+        stack = [(self.root, ())]
+        directory_count = 0
+        while stack:
+            directory, owners = stack.pop()
+            directory_count += 1
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                logger.error(f"Could not scan directory {directory}: {e}")
+                continue
+
+            files = []
+            subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name.lower() not in PRUNED_DIRS:
+                            subdirs.append(entry.path)
+                    elif entry.is_file():
+                        files.append(entry)
+                except OSError as e:
+                    logger.error(f"Could not stat {entry.path}: {e}")
+
+            csproj_files = [entry.name for entry in files if entry.name.lower().endswith(".csproj")]
+            if csproj_files:
+                project = ProjectFiles(directory)
+                project.csproj_files = csproj_files
+                self.projects[normalize_path(directory)] = project
+                owners = owners + (project,)
+
+            if owners:
+                for entry in files:
+                    for project in owners:
+                        project.add_file(entry.path, entry.name)
+
+            # Reverse so directories are visited in name order
+            stack.extend((subdir, owners) for subdir in reversed(subdirs))
+
+        logger.debug(f"Indexed {len(self.projects)} project(s) in {directory_count} directories under {self.root}")
+
+    def project(self, project_dir):
+        """Return the ProjectFiles for project_dir, or None if it holds no .csproj"""
+        return self.projects.get(normalize_path(project_dir))
+
+    def project_dirs(self):
+        return sorted(project.project_dir for project in self.projects.values())